@@ -0,0 +1,236 @@
+﻿"""Набор бенчмарков пропускной способности ZipHandler.
+
+Генерирует синтетические наборы данных (много мелких файлов, несколько
+огромных, несжимаемые, хорошо и предельно сжимаемые данные) и измеряет
+create_zip, extract_zip (последовательно и в пуле процессов) и get_zip_info:
+время, МБ/с, пиковый RSS и загрузку CPU. Распакованные файлы сверяются с
+исходными, так что набор заодно проверяет, что архивы самого ZipHandler
+проходят защиту от ZIP-бомб. Каждый замер выполняется в отдельном процессе,
+чтобы пиковый RSS относился только к нему. Результаты пишутся в JSON для
+сравнения между запусками; сеть не нужна.
+
+Запуск из каталога bpo_2:
+    python benchmarks/bench_archive_suite.py --output results.json
+    python benchmarks/bench_archive_suite.py --quick --baseline results.json
+"""
+import argparse
+import filecmp
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from config import Config
+from security.path_validator import PathValidator
+from file_operations.file_manager import FileManager
+from file_operations.zip_handler import ZipHandler
+
+try:
+    import resource
+except ImportError:  # Windows: пиковый RSS и CPU дочерних процессов недоступны
+    resource = None
+
+OPERATIONS = ("create", "create_parallel", "info", "extract", "extract_parallel")
+CHUNK_SIZE = 1024 * 1024
+
+
+def make_corpora(root: Path, scale: float) -> dict:
+    """Создание наборов данных; возвращает имя -> {'files', 'bytes'}"""
+    rng = random.Random(0)
+    words = [bytes(rng.choices(b'abcdefghijklmnopqrstuvwxyz', k=rng.randint(3, 10))) for _ in range(300)]
+    
+    def text(size):
+        return b' '.join(rng.choices(words, k=size // 5 + 1))[:size]
+    
+    specs = {
+        "small_files": (int(2000 * scale), 4096, text),
+        "huge_files": (2, int(64 * 1024 * 1024 * scale), text),
+        "incompressible": (8, int(4 * 1024 * 1024 * scale), rng.randbytes),
+        "compressible": (8, int(4 * 1024 * 1024 * scale), text),
+        "zeros": (4, int(4 * 1024 * 1024 * scale), bytes),  # предельно сжимаемые: DEFLATE ~1000:1
+    }
+    
+    corpora = {}
+    for name, (count, size, generate) in specs.items():
+        for i in range(max(count, 1)):
+            path = root / name / f"dir_{i % 16}" / f"file_{i}.dat"
+            path.parent.mkdir(parents=True, exist_ok=True)
+            # Порциями, чтобы не раздувать RSS родителя (он наследуется замерами)
+            with open(path, 'wb') as f:
+                for offset in range(0, size, CHUNK_SIZE):
+                    f.write(generate(min(CHUNK_SIZE, size - offset)))
+        corpora[name] = {'files': max(count, 1), 'bytes': max(count, 1) * size}
+    return corpora
+
+
+def own_peak_rss(rusage) -> int:
+    """Пиковый RSS текущего процесса в байтах.
+    
+    В Linux ru_maxrss переживает fork/exec и содержит пик родителя, поэтому
+    предпочитается VmHWM из /proc, который сбрасывается при exec.
+    """
+    try:
+        with open('/proc/self/status', 'r', encoding='ascii') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    # ru_maxrss: килобайты в Linux, байты в macOS
+    return rusage.ru_maxrss * (1 if sys.platform == 'darwin' else 1024)
+
+
+def resource_snapshot() -> tuple:
+    """(CPU-секунды процесса и его завершенных потомков, пиковый RSS в байтах или None)"""
+    if resource is None:
+        return time.process_time(), None
+    
+    own = resource.getrusage(resource.RUSAGE_SELF)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    cpu = own.ru_utime + own.ru_stime + children.ru_utime + children.ru_stime
+    children_rss = children.ru_maxrss * (1 if sys.platform == 'darwin' else 1024)
+    return cpu, max(own_peak_rss(own), children_rss)
+
+
+def run_case(base_dir: str, corpus: str, operation: str) -> dict:
+    """Один замер (выполняется в отдельном процессе)"""
+    Config.BASE_DIR = Path(base_dir)
+    validator = PathValidator(Config.BASE_DIR)
+    zip_handler = ZipHandler(FileManager(None, validator), validator)
+    archive = f"{corpus}.zip"
+    
+    actions = {
+        "create": lambda: zip_handler.create_zip([corpus], archive),
+        "create_parallel": lambda: zip_handler.create_zip([corpus], f"{corpus}_parallel.zip", parallel=True),
+        "info": lambda: zip_handler.get_zip_info(archive),
+        "extract": lambda: zip_handler.extract_zip(archive, f"out_{operation}"),
+        "extract_parallel": lambda: zip_handler.extract_zip(archive, f"out_{operation}", parallel=True),
+    }
+    
+    cpu_before, _ = resource_snapshot()
+    start = time.perf_counter()
+    actions[operation]()
+    elapsed = time.perf_counter() - start
+    cpu_after, peak_rss = resource_snapshot()
+    
+    return {
+        'seconds': elapsed,
+        'cpu_seconds': cpu_after - cpu_before,
+        'peak_rss_bytes': peak_rss,
+    }
+
+
+def measure(base_dir: Path, corpus: str, operation: str) -> dict:
+    """Запуск замера в дочернем процессе интерпретатора"""
+    completed = subprocess.run(
+        [sys.executable, __file__, '--case', str(base_dir), corpus, operation],
+        capture_output=True, text=True, check=True,
+    )
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def verify_round_trip(source: Path, extracted: Path):
+    """Сверка распакованного дерева с исходным побайтно"""
+    for path in source.rglob('*'):
+        if path.is_file():
+            target = extracted / path.relative_to(source)
+            if not target.is_file() or not filecmp.cmp(path, target, shallow=False):
+                raise RuntimeError(f"Распакованный файл не совпадает с исходным: {target}")
+
+
+def print_comparison(results: list, baseline_path: str):
+    """Изменение МБ/с относительно предыдущего запуска"""
+    with open(baseline_path, 'r', encoding='utf-8') as f:
+        baseline = {(r['corpus'], r['operation']): r for r in json.load(f)['results']}
+    
+    print(f"\nСравнение с {baseline_path}:")
+    for result in results:
+        previous = baseline.get((result['corpus'], result['operation']))
+        if previous and previous['mb_per_s']:
+            change = (result['mb_per_s'] / previous['mb_per_s'] - 1) * 100
+            print(f"  {result['corpus']:<16} {result['operation']:<17} {change:+7.1f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--case', nargs=3, metavar=('BASE_DIR', 'CORPUS', 'OPERATION'), help=argparse.SUPPRESS)
+    parser.add_argument('--scale', type=float, default=1.0, help="множитель размеров наборов данных")
+    parser.add_argument('--quick', action='store_true', help="уменьшенные наборы (scale = 0.1)")
+    parser.add_argument('--operations', nargs='+', choices=OPERATIONS, default=list(OPERATIONS))
+    parser.add_argument('--output', help="файл для результатов в JSON (по умолчанию - только stdout)")
+    parser.add_argument('--baseline', help="JSON предыдущего запуска для сравнения")
+    args = parser.parse_args()
+    
+    if args.case:
+        print(json.dumps(run_case(*args.case)))
+        return
+    
+    scale = 0.1 if args.quick else args.scale
+    results = []
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        base_dir = Path(tmp).resolve()
+        corpora = make_corpora(base_dir, scale)
+        
+        print(f"{'Набор':<16} {'Операция':<17} {'Время, с':>9} {'МБ/с':>9} {'CPU, %':>7} {'Пик RSS, МБ':>12}")
+        for corpus, info in corpora.items():
+            for operation in args.operations:
+                # Распаковке и сведениям нужен архив последовательного create
+                if operation in ("info", "extract", "extract_parallel") and not (base_dir / f"{corpus}.zip").exists():
+                    measure(base_dir, corpus, "create")
+                
+                metrics = measure(base_dir, corpus, operation)
+                if operation in ("extract", "extract_parallel"):
+                    verify_round_trip(base_dir / corpus, base_dir / f"out_{operation}" / corpus)
+                shutil.rmtree(base_dir / f"out_{operation}", ignore_errors=True)
+                
+                seconds = metrics['seconds']
+                result = {
+                    'corpus': corpus,
+                    'operation': operation,
+                    'files': info['files'],
+                    'bytes': info['bytes'],
+                    'seconds': seconds,
+                    'mb_per_s': info['bytes'] / seconds / (1024 * 1024) if seconds > 0 else None,
+                    'cpu_percent': metrics['cpu_seconds'] / seconds * 100 if seconds > 0 else None,
+                    'peak_rss_bytes': metrics['peak_rss_bytes'],
+                }
+                results.append(result)
+                
+                rss = f"{result['peak_rss_bytes'] / (1024 * 1024):.1f}" if result['peak_rss_bytes'] else "-"
+                print(f"{corpus:<16} {operation:<17} {seconds:>9.3f} {result['mb_per_s'] or 0:>9.1f} "
+                      f"{result['cpu_percent'] or 0:>7.0f} {rss:>12}")
+    
+    report = {
+        'meta': {
+            'timestamp': time.time(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'scale': scale,
+            'max_zip_size': Config.MAX_ZIP_SIZE,
+        },
+        'results': results,
+    }
+    
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"\nРезультаты записаны в {args.output}")
+    else:
+        print(json.dumps(report, ensure_ascii=False))
+    
+    if args.baseline:
+        print_comparison(results, args.baseline)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+﻿"""Бенчмарк бинарного ввода-вывода FileManager.
+
+Сравнивает текстовые read_file/write_file с read_bytes, readinto и
+write_bytes(memoryview): время и пиковый объем выделенной памяти
+(tracemalloc) на мегабайт данных.
+
+Запуск из каталога bpo_2:
+    python benchmarks/bench_binary_io.py --size 16777216 --repeat 5
+"""
+import argparse
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from config import Config
+from security.path_validator import PathValidator
+from file_operations.file_manager import FileManager
+
+
+def measure(func, repeat: int) -> tuple:
+    """Возвращает (лучшее время в секундах, пиковое выделение памяти в байтах)"""
+    best = float('inf')
+    peak = 0
+    for _ in range(repeat):
+        tracemalloc.start()
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+        peak = max(peak, tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+    return best, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--size', type=int, default=16 * 1024 * 1024)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+    
+    text = 'x' * args.size
+    data = bytearray(b'x' * args.size)
+    buffer = bytearray(args.size)
+    megabytes = args.size / (1024 * 1024)
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        Config.BASE_DIR = Path(tmp).resolve()
+        file_manager = FileManager(None, PathValidator(Config.BASE_DIR))
+        file_manager.write_bytes("data.bin", data, durability='fast')
+        
+        cases = [
+            ("read_file", lambda: file_manager.read_file("data.bin")),
+            ("read_bytes", lambda: file_manager.read_bytes("data.bin")),
+            ("readinto", lambda: file_manager.readinto("data.bin", buffer)),
+            ("write_file", lambda: file_manager.write_file("out.bin", text, durability='fast')),
+            ("write_bytes", lambda: file_manager.write_bytes("out.bin", memoryview(data), durability='fast')),
+        ]
+        
+        print(f"{'Операция':<14} {'МБ/с':>10} {'Пик, байт/МБ':>14}")
+        for label, func in cases:
+            elapsed, peak = measure(func, args.repeat)
+            print(f"{label:<14} {megabytes / elapsed:>10.1f} {peak / megabytes:>14.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+﻿"""Бенчмарк конкуренции читателей за блокировки FileManager.
+
+N потоков многократно читают один и тот же файл через FileManager.read_file.
+Сравниваются разделяемые блокировки чтения (текущая реализация) и монопольная
+блокировка на файл (прежнее поведение). Выигрыш заметен на многоядерных
+машинах, где чтение файла отпускает GIL на время системного вызова.
+
+Запуск из каталога bpo_2:
+    python benchmarks/bench_lock_contention.py --threads 1 2 4 8 --reads 2000
+"""
+import argparse
+import sys
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from config import Config
+from security.path_validator import PathValidator
+from file_operations.file_manager import FileManager
+
+
+class _ExclusiveLock:
+    """Монопольная блокировка с интерфейсом ReadWriteLock (прежнее поведение)"""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+    
+    @contextmanager
+    def read_lock(self):
+        with self._lock:
+            yield
+    
+    write_lock = read_lock
+
+
+def run(file_manager: FileManager, user_path: str, threads: int, reads: int) -> float:
+    """Возвращает число чтений в секунду для заданного числа потоков"""
+    barrier = threading.Barrier(threads + 1)
+    
+    def worker():
+        barrier.wait()
+        for _ in range(reads):
+            file_manager.read_file(user_path)
+    
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    for t in workers:
+        t.start()
+    
+    barrier.wait()
+    start = time.perf_counter()
+    for t in workers:
+        t.join()
+    elapsed = time.perf_counter() - start
+    
+    return threads * reads / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--threads', type=int, nargs='+', default=[1, 2, 4, 8])
+    parser.add_argument('--reads', type=int, default=2000, help="Чтений на поток")
+    parser.add_argument('--size', type=int, default=64 * 1024, help="Размер файла в байтах")
+    args = parser.parse_args()
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        Config.BASE_DIR = Path(tmp).resolve()
+        validator = PathValidator(Config.BASE_DIR)
+        (Config.BASE_DIR / 'shared.txt').write_text('x' * args.size, encoding='utf-8')
+        
+        shared = FileManager(None, validator)
+        exclusive = FileManager(None, validator)
+        exclusive_lock = _ExclusiveLock()
+        exclusive._get_file_lock = lambda path: exclusive_lock
+        
+        # Прогрев страничного кеша и интерпретатора
+        run(shared, 'shared.txt', 1, min(args.reads, 50))
+        
+        print(f"{'Потоков':>8} {'Разделяемая, чт/с':>20} {'Монопольная, чт/с':>20} {'Ускорение':>10}")
+        for threads in args.threads:
+            shared_rate = run(shared, 'shared.txt', threads, args.reads)
+            exclusive_rate = run(exclusive, 'shared.txt', threads, args.reads)
+            print(f"{threads:>8} {shared_rate:>20.0f} {exclusive_rate:>20.0f} {shared_rate / exclusive_rate:>9.2f}x")
+
+
+if __name__ == '__main__':
+    main()
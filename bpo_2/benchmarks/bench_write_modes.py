@@ -0,0 +1,68 @@
+﻿"""Бенчмарк пропускной способности режимов записи FileManager.
+
+Для каждого режима надежности (fast, safe, versioned) и для дозаписи
+измеряется скорость маленьких и больших записей.
+
+Запуск из каталога bpo_2:
+    python benchmarks/bench_write_modes.py --small-count 500 --large-count 10
+"""
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from config import Config
+from security.path_validator import PathValidator
+from file_operations.file_manager import FileManager, DurabilityMode
+
+
+def bench_writes(file_manager: FileManager, mode: str, payload: str, count: int) -> tuple:
+    """Возвращает (операций в секунду, МБ в секунду) для count записей"""
+    start = time.perf_counter()
+    for i in range(count):
+        file_manager.write_file(f"{mode}/file_{i % 16}.txt", payload, durability=mode)
+    elapsed = time.perf_counter() - start
+    return count / elapsed, count * len(payload) / elapsed / (1024 * 1024)
+
+
+def bench_appends(file_manager: FileManager, mode: str, payload: str, count: int) -> tuple:
+    """Дозапись count порций в один файл"""
+    start = time.perf_counter()
+    for _ in range(count):
+        file_manager.append_file(f"append_{mode}/log.txt", payload, durability=mode)
+    elapsed = time.perf_counter() - start
+    return count / elapsed, count * len(payload) / elapsed / (1024 * 1024)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--small-size', type=int, default=1024)
+    parser.add_argument('--small-count', type=int, default=500)
+    parser.add_argument('--large-size', type=int, default=8 * 1024 * 1024)
+    parser.add_argument('--large-count', type=int, default=10)
+    args = parser.parse_args()
+    
+    cases = [
+        ("малые", 'x' * args.small_size, args.small_count),
+        ("большие", 'x' * args.large_size, args.large_count),
+    ]
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        Config.BASE_DIR = Path(tmp).resolve()
+        file_manager = FileManager(None, PathValidator(Config.BASE_DIR))
+        
+        print(f"{'Операция':<20} {'Записи':<8} {'оп/с':>10} {'МБ/с':>10}")
+        for label, payload, count in cases:
+            for mode in DurabilityMode.ALL:
+                ops, mbps = bench_writes(file_manager, mode, payload, count)
+                print(f"{'write ' + mode:<20} {label:<8} {ops:>10.1f} {mbps:>10.1f}")
+            for mode in (DurabilityMode.FAST, DurabilityMode.SAFE):
+                ops, mbps = bench_appends(file_manager, mode, payload, count)
+                print(f"{'append ' + mode:<20} {label:<8} {ops:>10.1f} {mbps:>10.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+﻿"""Бенчмарк адаптивного выбора метода сжатия ZIP.
+
+Для нескольких синтетических наборов (текст, несжимаемые данные, "медиа" с
+расширениями сжатых форматов, смесь) сравнивает DEFLATE по умолчанию с
+режимами CompressionPolicy: время, МБ/с исходных данных, степень сжатия и
+распределение выбранных методов.
+
+Запуск из каталога bpo_2:
+    python benchmarks/bench_zip_compression.py --files 40 --file-size 1048576
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+import zipfile
+from collections import Counter
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from config import Config
+from security.path_validator import PathValidator
+from file_operations.file_manager import FileManager
+from file_operations.zip_handler import ZipHandler
+from file_operations.compression_policy import CompressionPolicy
+
+METHOD_NAMES = {
+    zipfile.ZIP_STORED: "stored",
+    zipfile.ZIP_DEFLATED: "deflate",
+    zipfile.ZIP_BZIP2: "bzip2",
+    zipfile.ZIP_LZMA: "lzma",
+}
+
+
+def make_text(rng: random.Random, words: list, size: int) -> bytes:
+    return b' '.join(rng.choices(words, k=size // 5))[:size]
+
+
+def make_corpora(root: Path, files: int, file_size: int) -> dict:
+    """Создание наборов файлов; возвращает имя набора -> объем в байтах"""
+    rng = random.Random(0)
+    words = [bytes(rng.choices(b'abcdefghijklmnopqrstuvwxyz', k=rng.randint(3, 10))) for _ in range(2000)]
+    generators = {
+        "text": lambda i: ("txt", make_text(rng, words, file_size)),
+        "random": lambda i: ("bin", os.urandom(file_size)),
+        "media": lambda i: ("jpg", os.urandom(file_size)),
+        "mixed": lambda i: (("txt", make_text(rng, words, file_size)) if i % 2 else ("bin", os.urandom(file_size))),
+    }
+    sizes = {}
+    for name, generate in generators.items():
+        total = 0
+        for i in range(files):
+            suffix, data = generate(i)
+            path = root / name / f"file_{i}.{suffix}"
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_bytes(data)
+            total += len(data)
+        sizes[name] = total
+    return sizes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--files', type=int, default=40)
+    parser.add_argument('--file-size', type=int, default=1024 * 1024)
+    parser.add_argument('--parallel', action='store_true', help="сжатие в пуле процессов")
+    args = parser.parse_args()
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        Config.BASE_DIR = Path(tmp).resolve()
+        validator = PathValidator(Config.BASE_DIR)
+        zip_handler = ZipHandler(FileManager(None, validator), validator)
+        sizes = make_corpora(Config.BASE_DIR, args.files, args.file_size)
+        
+        policies = [("deflate", None)] + [(mode, CompressionPolicy(mode)) for mode in CompressionPolicy.ALL]
+        
+        print(f"{'Набор':<8} {'Режим':<10} {'Время, с':>9} {'МБ/с':>8} {'Сжатие, %':>10}  Методы")
+        for corpus, total in sizes.items():
+            for label, policy in policies:
+                start = time.perf_counter()
+                zip_handler.create_zip([corpus], "bench.zip", parallel=args.parallel, policy=policy)
+                elapsed = time.perf_counter() - start
+                
+                archive = Config.BASE_DIR / "bench.zip"
+                with zipfile.ZipFile(archive) as zipf:
+                    methods = Counter(METHOD_NAMES[info.compress_type] for info in zipf.infolist())
+                saved = (1 - archive.stat().st_size / total) * 100
+                summary = ', '.join(f"{name}: {count}" for name, count in sorted(methods.items()))
+                print(f"{corpus:<8} {label:<10} {elapsed:>9.2f} {total / elapsed / (1024 * 1024):>8.1f} "
+                      f"{saved:>10.1f}  {summary}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+﻿"""Бенчмарк параллельного сжатия ZipHandler.create_zip.
+
+Создает синтетический набор файлов (много мелких и несколько крупных,
+сжимаемых и случайных) и сравнивает последовательное сжатие с пулом
+процессов разного размера: время, МБ/с и размер архива.
+
+Запуск из каталога bpo_2:
+    python benchmarks/bench_zip_parallel.py --small-count 2000 --large-count 4 --workers 1 2 4 8
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from config import Config
+from security.path_validator import PathValidator
+from file_operations.file_manager import FileManager
+from file_operations.zip_handler import ZipHandler
+
+
+def make_corpus(root: Path, small_count: int, small_size: int, large_count: int, large_size: int) -> int:
+    """Создание набора файлов; возвращает общий объем в байтах"""
+    rng = random.Random(0)
+    words = [bytes(rng.choices(b'abcdefghijklmnopqrstuvwxyz', k=rng.randint(3, 10))) for _ in range(500)]
+    total = 0
+    
+    for i in range(small_count):
+        path = root / "corpus" / f"dir_{i % 32}" / f"small_{i}.txt"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        data = b' '.join(rng.choices(words, k=small_size // 6))[:small_size]
+        path.write_bytes(data)
+        total += len(data)
+    
+    for i in range(large_count):
+        path = root / "corpus" / f"large_{i}.bin"
+        # Половина - текст, половина - несжимаемые данные
+        text = b' '.join(rng.choices(words, k=large_size // 12))[:large_size // 2]
+        data = text + os.urandom(large_size - len(text))
+        path.write_bytes(data)
+        total += len(data)
+    
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--small-count', type=int, default=2000)
+    parser.add_argument('--small-size', type=int, default=4096)
+    parser.add_argument('--large-count', type=int, default=4)
+    parser.add_argument('--large-size', type=int, default=32 * 1024 * 1024)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, os.cpu_count() or 1])
+    args = parser.parse_args()
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        Config.BASE_DIR = Path(tmp).resolve()
+        validator = PathValidator(Config.BASE_DIR)
+        zip_handler = ZipHandler(FileManager(None, validator), validator)
+        total = make_corpus(Config.BASE_DIR, args.small_count, args.small_size, args.large_count, args.large_size)
+        megabytes = total / (1024 * 1024)
+        
+        cases = [("последовательно", dict(parallel=False))]
+        cases += [(f"процессов: {n}", dict(parallel=True, max_workers=n)) for n in sorted(set(args.workers))]
+        
+        print(f"Исходных данных: {megabytes:.1f} МБ")
+        print(f"{'Режим':<18} {'Время, с':>10} {'МБ/с':>10} {'Архив, МБ':>10}")
+        for label, options in cases:
+            start = time.perf_counter()
+            zip_handler.create_zip(["corpus"], "bench.zip", **options)
+            elapsed = time.perf_counter() - start
+            size = (Config.BASE_DIR / "bench.zip").stat().st_size / (1024 * 1024)
+            print(f"{label:<18} {elapsed:>10.2f} {megabytes / elapsed:>10.1f} {size:>10.2f}")
+
+
+if __name__ == '__main__':
+    main()
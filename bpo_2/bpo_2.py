@@ -1,16 +1,26 @@
 ﻿import os
 import json
 import xml.etree.ElementTree as ET
+import defusedxml.ElementTree as SafeET
+from defusedxml.common import DefusedXmlException
 import zipfile
+import fnmatch
 import shutil
 import getpass
 import platform
 import hashlib
 import time
 import sqlite3
+import uuid
+from collections import OrderedDict
 from datetime import datetime
+from pathlib import Path
+from config import Config
 from database.models import DatabaseManager
 from database.operations import SecureDBOperations
+from security.path_validator import PathValidator, PathTraversalError
+from file_operations.zip_index import ZipIndex, read_central_directory
+from file_operations.zip_handler import ZipBombError, _archive_budget, _inflate_chunks
 
 class UserManager:
     def __init__(self):
@@ -284,6 +294,12 @@ class LinuxLikeFileSystem:
         self.user_manager = user_manager
         self.db_operations = SecureDBOperations()  # ← ДОБАВИТЬ
         self.navigation_history = []
+        self.zip_mounts = {}  # id монтирования -> архив, смонтированный только для чтения
+        self.zip_cache = OrderedDict()  # LRU распакованных членов архивов: (id, имя) -> текст
+        if not Config.BASE_DIR.exists():
+            Config.init_directories()
+        # Один индекс архивов на сеанс; база лежит рядом с BASE_DIR, а не в текущем каталоге
+        self.zip_index = ZipIndex(str(Config.BASE_DIR.parent / Config.ZIP_INDEX_DB_PATH))
         self.init_file_system()
 
     def init_file_system(self):
@@ -483,12 +499,156 @@ class LinuxLikeFileSystem:
         node = self.fs['/']
         
         for part in parts:
-            if part in node.get('children', {}):
-                node = node['children'][part]
+            children = self._get_children(node)
+            if part in children:
+                node = children[part]
             else:
                 return None
         return node
 
+    def _get_children(self, node):
+        """Дочерние узлы; внутри смонтированного архива строятся при первом обращении"""
+        if 'zip_mount' in node and node['type'] == 'directory' and 'children' not in node:
+            mount = self.zip_mounts[node['zip_mount']]
+            prefix = node['zip_prefix']
+            node['children'] = {
+                row['name'][len(prefix):].rstrip('/'): self._zip_node(node['zip_mount'], row)
+                for row in mount['by_parent'].get(prefix, [])
+            }
+        return node.get('children', {})
+
+    def _zip_node(self, mount_id, row):
+        """Узел для члена архива (директории - без детей до первого обращения)"""
+        mount = self.zip_mounts[mount_id]
+        node = {
+            'type': 'directory' if row['is_dir'] else 'file',
+            'permissions': 'dr-xr-xr-x' if row['is_dir'] else '-r--r--r--',
+            'owner': mount['owner'],
+            'group': mount['group'],
+            'created': row['date_time'] or mount['created'],
+            'zip_mount': mount_id,
+        }
+        if row['is_dir']:
+            node['zip_prefix'] = row['name']
+        else:
+            node['zip_member'] = row['name']
+            node['size'] = row['file_size']
+            node['compressed_size'] = row['compress_size']
+        return node
+
+    def _in_zip_mount(self, path):
+        """Лежит ли путь внутри смонтированного архива (включая саму точку монтирования)"""
+        node = self.fs['/']
+        for part in [p for p in path.split('/') if p]:
+            node = self._get_children(node).get(part)
+            if node is None:
+                return False
+            if 'zip_mount' in node:
+                return True
+        return False
+
+    def _read_zip_member(self, node):
+        """Распаковка одного члена архива по запросу с LRU-кешем распакованных членов"""
+        key = (node['zip_mount'], node['zip_member'])
+        if key in self.zip_cache:
+            self.zip_cache.move_to_end(key)
+            return self.zip_cache[key]
+        
+        if node['size'] > Config.MAX_FILE_SIZE:
+            raise ValueError("Файл слишком большой")
+        
+        # Архив открыт один раз при монтировании; заявленному размеру не доверяем -
+        # распакованный объем ограничивается по ходу чтения
+        mount = self.zip_mounts[node['zip_mount']]
+        zipf = mount['zipf']
+        budget = min(Config.MAX_FILE_SIZE, mount['budget'])
+        data = b''.join(_inflate_chunks(zipf, zipf.getinfo(node['zip_member']), budget))
+        content = data.decode('utf-8', errors='replace')
+        
+        if node['size'] <= Config.ZIP_MOUNT_CACHE_MAX_MEMBER:
+            self.zip_cache[key] = content
+            while len(self.zip_cache) > Config.ZIP_MOUNT_CACHE_SIZE:
+                self.zip_cache.popitem(last=False)
+        return content
+
+    def mount_zip(self, zip_name, mount_name):
+        """Смонтировать ZIP архив из базового каталога в текущую директорию только для чтения"""
+        current_node = self.get_node(self.current_path)
+        if self._in_zip_mount(self.current_path):
+            print("Ошибка: Смонтированный архив доступен только для чтения")
+            return
+        
+        if not self.check_permission(current_node, 'w'):
+            print(f"Ошибка: Нет прав на запись в текущую директорию")
+            return
+        
+        if mount_name in self._get_children(current_node):
+            print(f"Ошибка: '{mount_name}' уже существует")
+            return
+        
+        try:
+            if not Config.BASE_DIR.exists():
+                Config.init_directories()
+            zip_path = PathValidator(Config.BASE_DIR).validate_path(zip_name)
+            # Центральный каталог читается один раз; узлы создаются по мере обхода
+            rows = read_central_directory(zip_path)
+            budget = _archive_budget(zip_path.stat().st_size)
+            zipf = zipfile.ZipFile(zip_path, 'r')
+        except (PathTraversalError, OSError, zipfile.BadZipFile) as e:
+            print(f"Ошибка: Не удалось смонтировать архив {zip_name}: {e}")
+            return
+        
+        by_parent = {}
+        for row in rows:
+            by_parent.setdefault(row['parent'], []).append(row)
+        
+        mount_id = max(self.zip_mounts, default=0) + 1
+        created = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        self.zip_mounts[mount_id] = {
+            'zip_path': zip_path,
+            'zipf': zipf,
+            'budget': budget,
+            'by_parent': by_parent,
+            'owner': self.user_manager.get_username() or 'unknown',
+            'group': self.user_manager.get_user_group(),
+            'created': created,
+        }
+        current_node.setdefault('children', {})[mount_name] = {
+            'type': 'directory',
+            'permissions': 'dr-xr-xr-x',
+            'owner': self.zip_mounts[mount_id]['owner'],
+            'group': self.zip_mounts[mount_id]['group'],
+            'created': created,
+            'zip_mount': mount_id,
+            'zip_prefix': '',
+        }
+        
+        mount_path = f"{self.current_path}/{mount_name}" if self.current_path != '/' else f"/{mount_name}"
+        self.log_to_db(
+            operation_type="ZIP_MOUNT",
+            file_path=mount_path,
+            details=f"Смонтирован архив '{zip_name}' ({len(rows)} элементов)"
+        )
+        print(f"Архив '{zip_name}' смонтирован в {mount_path} (только чтение)")
+
+    def umount_zip(self, mount_name):
+        """Отмонтировать архив, смонтированный в текущей директории"""
+        current_node = self.get_node(self.current_path)
+        node = self._get_children(current_node).get(mount_name)
+        if not node or node.get('zip_prefix') != '' or 'zip_mount' not in node:
+            print(f"Ошибка: '{mount_name}' не является точкой монтирования архива")
+            return
+        
+        mount_id = node['zip_mount']
+        mount = self.zip_mounts.pop(mount_id)
+        mount['zipf'].close()
+        for key in [key for key in self.zip_cache if key[0] == mount_id]:
+            del self.zip_cache[key]
+        del current_node['children'][mount_name]
+        
+        # Текущий путь не может остаться внутри отмонтированного архива (мы в родителе)
+        print(f"Архив '{mount['zip_path'].name}' отмонтирован")
+
     def check_permission(self, node, permission='r'):
         """Проверка прав доступа к файлу/директории"""
         if not self.user_manager.current_user:
@@ -581,7 +741,7 @@ class LinuxLikeFileSystem:
             if parent_node:
                 print(f"{parent_node['permissions']:12} {parent_node['owner']:8} {parent_node['group']:8} {'-':8} {parent_node['created']:19} {'..'}")
         
-        for name, item in node.get('children', {}).items():
+        for name, item in self._get_children(node).items():
             size = str(item.get('size', '')) if item['type'] == 'file' else '-'
             print(f"{item['permissions']:12} {item['owner']:8} {item['group']:8} {size:8} {item['created']:19} {name}")
 
@@ -657,6 +817,10 @@ class LinuxLikeFileSystem:
 
     def mkdir(self, name):
         current_node = self.get_node(self.current_path)
+        if self._in_zip_mount(self.current_path):
+            print("Ошибка: Смонтированный архив доступен только для чтения")
+            return
+        
         if not self.check_permission(current_node, 'w'):
             print(f"Ошибка: Нет прав на запись в текущую директорию")
             return
@@ -698,6 +862,10 @@ class LinuxLikeFileSystem:
             print(f"Ошибка: Текущая директория '{self.current_path}' не существует")
             return
     
+        if self._in_zip_mount(self.current_path):
+            print("Ошибка: Смонтированный архив доступен только для чтения")
+            return
+    
         if not self.check_permission(current_node, 'w'):
             print(f"Ошибка: Нет прав на запись в текущую директорию")
             return
@@ -791,9 +959,17 @@ class LinuxLikeFileSystem:
         elif not self.check_permission(node, 'r'):
             print(f"Ошибка: Нет прав на чтение файла '{name}'")
         else:
+            if 'zip_member' in node:
+                try:
+                    content = self._read_zip_member(node)
+                except (ZipBombError, ValueError, OSError, zipfile.BadZipFile) as e:
+                    print(f"Ошибка: Не удалось прочитать '{name}' из архива: {e}")
+                    return
+            else:
+                content = node.get('content', '')
             print(f"\nСодержимое файла '{name}':")
             print("-" * 40)
-            print(node.get('content', ''))
+            print(content)
             print("-" * 40)
 
     def rm(self, name):
@@ -804,6 +980,10 @@ class LinuxLikeFileSystem:
             print(f"Ошибка: '{name}' не существует")
             return
         
+        if self._in_zip_mount(target_path):
+            print("Ошибка: Смонтированный архив доступен только для чтения (для отключения - umount)")
+            return
+        
         if not self.check_permission(node, 'w'):
             print(f"Ошибка: Нет прав на удаление '{name}'")
             return
@@ -832,6 +1012,10 @@ class LinuxLikeFileSystem:
             print(f"Ошибка: '{old_name}' не существует")
             return
         
+        if self._in_zip_mount(old_path):
+            print("Ошибка: Смонтированный архив доступен только для чтения")
+            return
+        
         if not self.check_permission(old_node, 'w'):
             print(f"Ошибка: Нет прав на переименование '{old_name}'")
             return
@@ -862,6 +1046,10 @@ class LinuxLikeFileSystem:
             print(f"Ошибка: '{name}' не является файлом")
             return  # ДОБАВЛЕН return
     
+        if self._in_zip_mount(file_path):
+            print("Ошибка: Смонтированный архив доступен только для чтения")
+            return
+    
         # Проверка прав доступа
         if not self.check_permission(node, 'w'):
             print(f"Ошибка: Нет прав на запись в файл '{name}'")
@@ -974,6 +1162,9 @@ class LinuxLikeFileSystem:
     def update_disk_usage(self):
         """Обновить использование дисков на основе реальных данных"""
         def calculate_fs_size(node):
+            # Смонтированные архивы не занимают место виртуальной файловой системы
+            if 'zip_mount' in node:
+                return 0
             size = 0
             node_type = node.get('type')
             if node_type == 'file':
@@ -1102,7 +1293,7 @@ class LinuxLikeFileSystem:
             return
         
         directories = []
-        for name, item in current_node.get('children', {}).items():
+        for name, item in self._get_children(current_node).items():
             if item['type'] == 'directory':
                 directories.append(name)
         
@@ -1157,6 +1348,8 @@ class LinuxLikeFileSystem:
             print(' '*30, "6. Редактировать файл (edit)")
             print(' '*30, "7. Переименовать файл/директорию")
             print(' '*30, "8. Информация о файле/директории")
+            print(' '*30, "9. Смонтировать ZIP архив (mount)")
+            print(' '*30, "10. Отмонтировать ZIP архив (umount)")
             print(' '*30, "0. Назад к навигации")
             
             choice = input("Выберите действие: ").strip()
@@ -1210,6 +1403,19 @@ class LinuxLikeFileSystem:
                     self.file_info(name)
                 else:
                     print("Имя не может быть пустым")
+            elif choice == '9' or choice == 'mount':
+                zip_name = input("Введите путь к ZIP архиву в базовом каталоге: ").strip()
+                mount_name = input("Введите имя точки монтирования: ").strip()
+                if zip_name and mount_name:
+                    self.mount_zip(zip_name, mount_name)
+                else:
+                    print("Имена не могут быть пустыми")
+            elif choice == '10' or choice == 'umount':
+                name = input("Введите имя точки монтирования: ").strip()
+                if name:
+                    self.umount_zip(name)
+                else:
+                    print("Имя не может быть пустым")
             elif choice == '0':
                 break
             else:
@@ -1232,12 +1438,17 @@ class LinuxLikeFileSystem:
         
         if node.get('type') == 'file':
             print(f"  Размер: {node.get('size', 0)} байт")
-            content = node.get('content', '')
-            print(f"  Строк: {len(content.splitlines())}")
+            if 'zip_member' in node:
+                # Без распаковки: сведения из центрального каталога
+                print(f"  Сжатый размер: {node.get('compressed_size', 0)} байт")
+                print(f"  Архив: {self.zip_mounts[node['zip_mount']]['zip_path'].name}")
+            else:
+                content = node.get('content', '')
+                print(f"  Строк: {len(content.splitlines())}")
             if node.get('modified'):
                 print(f"  Изменен: {node.get('modified')}")
         else:
-            children = node.get('children', {})
+            children = self._get_children(node)
             children_count = len(children)
             print(f"  Элементов: {children_count}")
             if children_count > 0:
@@ -1336,7 +1547,7 @@ def json_xml_menu():
         else:
             print("Неверный выбор")
 
-def zip_operations_menu():
+def zip_operations_menu(zip_index):
     """Меню операций с ZIP архивами"""
     while True:
         print("\n=== ОПЕРАЦИИ С ZIP АРХИВАМИ ===")
@@ -1352,7 +1563,7 @@ def zip_operations_menu():
         elif choice == '2':
             extract_zip_archive()
         elif choice == '3':
-            view_zip_contents()
+            view_zip_contents(zip_index)
         elif choice == '0':
             break
         else:
@@ -1435,18 +1646,35 @@ def create_xml_file():
 def read_xml_file():
     filename = input("Введите имя XML файла: ")
     try:
-        tree = ET.parse(filename)
-        root = tree.getroot()
-        
-        print("Содержимое XML файла:")
-        def print_element(element, indent=0):
-            print(' ' * indent + f"<{element.tag}>: {element.text or ''}")
-            for child in element:
-                print_element(child, indent + 2)
-        
-        print_element(root)
+        # Потоковый разбор: элемент печатается, как только известен его текст
+        # (начался первый дочерний или элемент закрыт), затем удаляется из дерева
+        stack = []
+        
+        def print_element(entry):
+            element, indent, printed = entry
+            if not printed:
+                print(' ' * indent + f"<{element.tag}>: {element.text or ''}")
+                entry[2] = True
+        
+        for event, element in SafeET.iterparse(filename, events=('start', 'end')):
+            if event == 'start':
+                if stack:
+                    print_element(stack[-1])
+                else:
+                    print("Содержимое XML файла:")
+                stack.append([element, len(stack) * 2, False])
+                continue
+            
+            print_element(stack.pop())
+            element.clear()
+            if stack:
+                stack[-1][0].remove(element)
     except FileNotFoundError:
         print(f"Файл {filename} не найден")
+    except DefusedXmlException as e:
+        print(f"Обнаружена потенциально опасная XML конструкция: {e}")
+    except ET.ParseError as e:
+        print(f"Некорректный XML формат: {e}")
 
 def create_zip_archive():
     zip_name = input("Введите имя ZIP архива: ")
@@ -1465,22 +1693,70 @@ def create_zip_archive():
 def extract_zip_archive():
     zip_name = input("Введите имя ZIP архива: ")
     extract_dir = input("Введите директорию для распаковки (пусто - текущая): ") or '.'
+    pattern = input("Введите шаблон имен файлов, например *.txt (пусто - все): ").strip()
     
     try:
         with zipfile.ZipFile(zip_name, 'r') as zipf:
-            zipf.extractall(extract_dir)
-        print(f"ZIP архив {zip_name} распакован в {extract_dir}")
+            members = [info for info in zipf.infolist()
+                       if not pattern or fnmatch.fnmatchcase(info.filename, pattern)]
+            extract_members_checked(zipf, members, extract_dir, os.path.getsize(zip_name))
+            if pattern:
+                print(f"Из архива {zip_name} извлечено файлов: {len(members)} в {extract_dir}")
+            else:
+                print(f"ZIP архив {zip_name} распакован в {extract_dir}")
     except FileNotFoundError:
         print(f"ZIP архив {zip_name} не найден")
+    except (ZipBombError, ValueError) as e:
+        print(f"Ошибка распаковки: {e}")
 
-def view_zip_contents():
+def extract_members_checked(zipf, members, extract_dir, archive_size):
+    """Распаковка членов с теми же лимитами, что и в ZipHandler.extract_zip.
+    
+    Заявленный общий размер проверяется до распаковки, фактически распакованные
+    байты - по ходу (_inflate_chunks). Члены пишутся во временные файлы и заменяют
+    целевые только после успешной распаковки всех, так что при ошибке
+    существующие файлы не затрагиваются.
+    """
+    budget = _archive_budget(archive_size)
+    if sum(info.file_size for info in members) > budget:
+        raise ZipBombError("Превышен максимальный размер распакованных данных")
+    
+    base = Path(extract_dir).resolve()
+    staged = []  # (временный путь, целевой путь)
+    try:
+        for info in members:
+            target = (base / info.filename).resolve()
+            if not target.is_relative_to(base):
+                raise ValueError(f"Небезопасный путь в архиве: {info.filename}")
+            
+            if info.is_dir():
+                target.mkdir(parents=True, exist_ok=True)
+                continue
+            
+            target.parent.mkdir(parents=True, exist_ok=True)
+            staging = target.with_name(f".{target.name}.{uuid.uuid4().hex}.part")
+            staged.append((staging, target))
+            with open(staging, 'wb') as f:
+                for chunk in _inflate_chunks(zipf, info, budget):
+                    f.write(chunk)
+                    budget -= len(chunk)
+        
+        for staging, target in staged:
+            os.replace(staging, target)
+    finally:
+        for staging, _ in staged:
+            if staging.exists():
+                staging.unlink()
+
+def view_zip_contents(zip_index):
     zip_name = input("Введите имя ZIP архива: ")
     
     try:
-        with zipfile.ZipFile(zip_name, 'r') as zipf:
-            print(f"Содержимое архива {zip_name}:")
-            for file_info in zipf.infolist():
-                print(f"  {file_info.filename} ({file_info.file_size} bytes)")
+        # Повторный просмотр того же архива не разбирает центральный каталог заново
+        members = zip_index.list_members(Path(zip_name).resolve())
+        print(f"Содержимое архива {zip_name}:")
+        for member in members:
+            print(f"  {member['name']} ({member['file_size']} bytes)")
     except FileNotFoundError:
         print(f"ZIP архив {zip_name} не найден")
 
@@ -1566,7 +1842,7 @@ def main():
             elif choice == '2':
                 json_xml_menu()
             elif choice == '3':
-                zip_operations_menu()
+                zip_operations_menu(file_system.zip_index)
             elif choice == '4':
                 show_disk_info(file_system)
             elif choice == '5':
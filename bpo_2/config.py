@@ -6,10 +6,62 @@ class Config:
     BASE_DIR = Path("/safe_directory")
     MAX_FILE_SIZE = 100 * 1024 * 1024  # 100MB
     MAX_ZIP_SIZE = 500 * 1024 * 1024  # 500MB
+    ZIP_MAX_MEMBER_SIZE = 100 * 1024 * 1024  # Предел распакованного размера одного члена архива
+    # Предел отношения всего распакованного объема к размеру файла архива. Выше достижимого
+    # на обычных данных (DEFLATE ~1032:1, BZIP2 на постоянных данных ~10^6:1) - ловит архивы
+    # с перекрывающимися членами; основная защита - абсолютные лимиты выше
+    ZIP_MAX_RATIO = 2_000_000
+    ZIP_RATIO_MIN_SIZE = 1024 * 1024  # Столько байтов можно распаковать из архива любого размера
+    LOCK_STRIPES = 256  # Размер таблицы блокировок файлов
+    METADATA_CACHE_SIZE = 1024  # Число директорий в кеше листингов
+    DISK_INFO_TTL = 5  # Время жизни кеша сведений о дисках, секунд
+    WALKER_MAX_WORKERS = 8  # Потоки параллельного обхода дерева директорий
+    BULK_MAX_WORKERS = 8  # Потоки пакетных операций с файлами
+    HASH_MAX_WORKERS = 4  # Потоки хеширования содержимого файлов
+    ZIP_MAX_WORKERS = os.cpu_count() or 1  # Процессы параллельного сжатия ZIP
+    ZIP_CHUNK_SIZE = 4 * 1024 * 1024  # Размер фрагмента файла для параллельного сжатия
+    
+    # Адаптивное сжатие ZIP: режим "speed", "balanced" или "size"
+    ZIP_COMPRESSION_POLICY = "balanced"
+    ZIP_SAMPLE_SIZE = 64 * 1024  # Образец начала файла для оценки сжимаемости
+    ZIP_STORE_RATIO = 0.95  # Образец сжимается хуже - файл сохраняется без сжатия
+    ZIP_TEXT_RATIO = 0.35  # Образец сжимается лучше - хорошо сжимаемые данные (текст)
+    ZIP_DEFLATE_LEVEL = 6  # Уровень DEFLATE режима balanced
+    ZIP_MIN_COMPRESS_SIZE = 128  # Файлы меньше этого размера не сжимаются
+    ZIP_STORED_EXTENSIONS = {
+        ".zip", ".gz", ".tgz", ".bz2", ".xz", ".7z", ".rar", ".zst",
+        ".jpg", ".jpeg", ".png", ".gif", ".webp", ".mp3", ".mp4", ".mkv", ".avi", ".mov", ".ogg", ".flac",
+        ".docx", ".xlsx", ".pptx", ".odt", ".pdf",
+    }
+    
+    # Монтирование ZIP архивов в виртуальную файловую систему
+    ZIP_MOUNT_CACHE_SIZE = 16  # Число распакованных членов в кеше смонтированных архивов
+    ZIP_MOUNT_CACHE_MAX_MEMBER = 1024 * 1024  # Более крупные члены не кешируются
+    
+    # Потоковое чтение JSON/XML
+    PARSE_CHUNK_SIZE = 1024 * 1024  # Размер порции чтения файла
+    JSON_MAX_RECORD_SIZE = 64 * 1024 * 1024  # Предел размера одной записи (элемента массива или строки JSON Lines)
+    
+    # Квоты: BASE_DIR/<QUOTA_HOME_DIR>/<пользователь>/... принадлежит пользователю
+    QUOTA_HOME_DIR = "home"
+    QUOTA_DEFAULT_OWNER = "root"
+    QUOTA_DEFAULT_LIMIT = None  # Лимит по умолчанию в байтах (None - без ограничения)
+    QUOTA_RECONCILE_INTERVAL = 3600  # Период сверки счетчиков, секунд
+    QUOTA_FLUSH_INTERVAL = 30  # Период сохранения измененных счетчиков в БД, секунд
+    
+    # Асинхронный интерфейс: размер пула и лимиты параллельности по классам операций
+    ASYNC_MAX_WORKERS = 16
+    ASYNC_CONCURRENCY_LIMITS = {"io": 16, "archive": 2, "parse": 4}
+    
+    # Надежность записи: "fast", "safe" или "versioned"
+    WRITE_DURABILITY = "versioned"
+    WRITE_BACKUP_COUNT = 1  # Число резервных копий .bak в режиме versioned
     
     # Настройки базы данных
     DB_TYPE = "sqlite"  # "postgresql", "mysql", "sqlite"
     DB_PATH = "file_manager.db"
+    HASH_DB_PATH = "content_hashes.db"  # Индекс хешей содержимого файлов
+    ZIP_INDEX_DB_PATH = "zip_index.db"  # Индекс содержимого ZIP архивов
     DB_HOST = "localhost"
     DB_PORT = 5432
     DB_NAME = "file_manager"
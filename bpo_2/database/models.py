@@ -7,6 +7,13 @@ import os
 import hashlib
 from config import Config
 
+class OperationType:
+    """Типы операций для журнала аудита (используются FileManager)"""
+    CREATE = "CREATE"
+    READ = "READ"
+    MODIFY = "MODIFY"
+    DELETE = "DELETE"
+
 class DatabaseManager:
     def __init__(self, db_path=None):
         self.db_path = db_path or "file_manager.db"
@@ -302,6 +309,18 @@ class DatabaseManager:
         """
         self.execute_query(query, (operation_type, user_id, file_id, file_path, details))
 
+    def log_operations_batch(self, entries):
+        """Пакетное логирование операций одной транзакцией (подготовленный запрос).
+        
+        entries - кортежи (operation_type, user_id, file_id, file_path, details)
+        """
+        query = """
+            INSERT INTO operations (operation_type, user_id, file_id, file_path, details) 
+            VALUES (?, ?, ?, ?, ?)
+        """
+        with self.transaction() as cursor:
+            cursor.executemany(query, entries)
+
     def get_operation_logs(self, user_id=None, limit=100):
         """Получить логи операций (подготовленный запрос)"""
         if user_id:
@@ -39,6 +39,10 @@ class SecureDBOperations:
         """Безопасное логирование операции"""  
         return self.db.log_operation(operation_type, user_id, file_id, file_path, details)
 
+    def safe_log_operations_batch(self, entries):
+        """Безопасное пакетное логирование операций одной транзакцией"""
+        return self.db.log_operations_batch(entries)
+
     def safe_get_audit_logs(self, user_id=None, limit=100):
         """Безопасное получение логов аудита"""
         return self.db.get_operation_logs(user_id, limit)
@@ -0,0 +1,172 @@
+﻿import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from config import Config
+from file_operations.file_manager import FileManager
+from file_operations.zip_handler import ZipHandler
+from file_operations.json_xml_handler import JSONXMLHandler
+
+
+class OperationClass:
+    """Классы операций, для каждого задается свой лимит параллельности"""
+    IO = "io"            # Чтение, запись, листинг, копирование
+    ARCHIVE = "archive"  # Создание, распаковка и просмотр ZIP
+    PARSE = "parse"      # Разбор и сериализация JSON/XML
+
+
+class AsyncFileService:
+    """asyncio-интерфейс над FileManager, ZipHandler и JSONXMLHandler.
+    
+    Блокирующие вызовы выполняются в ограниченном пуле потоков (zlib и файловый
+    ввод-вывод отпускают GIL), поэтому один цикл событий обслуживает много
+    клиентов без потока на запрос. Для каждого класса операций действует свой
+    лимит параллельности; у каждого вызова есть необязательный timeout.
+    
+    Слот лимита освобождается только после фактического завершения работы в
+    пуле: отмена или таймаут не позволяют превысить лимит "брошенными" задачами.
+    Задача, еще не начавшая выполняться, при отмене снимается из очереди.
+    Лимиты действуют в пределах цикла событий: asyncio.Semaphore привязан к
+    циклу, поэтому у каждого цикла свой набор семафоров (общий пул потоков
+    ограничивает суммарную нагрузку).
+    """
+    
+    def __init__(self, file_manager: FileManager, zip_handler: ZipHandler = None,
+                 json_xml_handler: JSONXMLHandler = None, max_workers: int = None, limits: dict = None):
+        self.file_manager = file_manager
+        self.zip_handler = zip_handler
+        self.json_xml_handler = json_xml_handler
+        self._executor = ThreadPoolExecutor(max_workers or Config.ASYNC_MAX_WORKERS,
+                                            thread_name_prefix="bpo-async")
+        self._limits = dict(Config.ASYNC_CONCURRENCY_LIMITS)
+        self._limits.update(limits or {})
+        self._semaphores = {}  # цикл событий -> {класс операций: семафор}
+    
+    async def __aenter__(self):
+        return self
+    
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.aclose()
+    
+    async def aclose(self):
+        """Остановка пула; задачи, не начавшие выполняться, отменяются"""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+    
+    async def _run(self, op_class: str, func, *args, timeout: float = None, **kwargs):
+        """Выполнение блокирующей функции в пуле с учетом лимита и таймаута"""
+        loop = asyncio.get_running_loop()
+        semaphore = self._get_semaphore(op_class)
+        await semaphore.acquire()
+        
+        try:
+            future = self._executor.submit(func, *args, **kwargs)
+        except Exception:
+            semaphore.release()
+            raise
+        
+        def release(_):
+            try:
+                loop.call_soon_threadsafe(semaphore.release)
+            except RuntimeError:
+                # Цикл событий уже закрыт
+                pass
+        
+        future.add_done_callback(release)
+        
+        # Отмена asyncio-future отменяет и задачу в пуле, если она еще в очереди
+        return await asyncio.wait_for(asyncio.wrap_future(future), timeout)
+    
+    def _get_semaphore(self, op_class: str) -> asyncio.Semaphore:
+        if op_class not in self._limits:
+            raise ValueError(f"Неизвестный класс операций: {op_class}")
+        loop = asyncio.get_running_loop()
+        semaphores = self._semaphores.get(loop)
+        if semaphores is None:
+            # Семафоры держат ссылку на свой цикл: закрытые циклы удаляются здесь
+            for closed in [known for known in self._semaphores if known.is_closed()]:
+                del self._semaphores[closed]
+            semaphores = self._semaphores[loop] = {}
+        if op_class not in semaphores:
+            semaphores[op_class] = asyncio.Semaphore(self._limits[op_class])
+        return semaphores[op_class]
+    
+    def _require(self, handler, name: str):
+        if handler is None:
+            raise RuntimeError(f"{name} не передан в AsyncFileService")
+        return handler
+    
+    # === ФАЙЛОВЫЕ ОПЕРАЦИИ ===
+    
+    async def list_directory(self, user_path: str = "", timeout: float = None) -> list:
+        return await self._run(OperationClass.IO, self.file_manager.list_directory, user_path, timeout=timeout)
+    
+    async def list_directory_page(self, user_path: str = "", offset: int = 0, limit: int = 100,
+                                  sort_by: str = 'name', reverse: bool = False, timeout: float = None) -> dict:
+        return await self._run(OperationClass.IO, self.file_manager.list_directory_page,
+                               user_path, offset, limit, sort_by, reverse, timeout=timeout)
+    
+    async def read_file(self, user_path: str, timeout: float = None) -> str:
+        return await self._run(OperationClass.IO, self.file_manager.read_file, user_path, timeout=timeout)
+    
+    async def read_range(self, user_path: str, offset: int, length: int, timeout: float = None) -> bytes:
+        return await self._run(OperationClass.IO, self.file_manager.read_range, user_path, offset, length,
+                               timeout=timeout)
+    
+    async def tail(self, user_path: str, n_lines: int = 10, timeout: float = None) -> str:
+        return await self._run(OperationClass.IO, self.file_manager.tail, user_path, n_lines, timeout=timeout)
+    
+    async def write_file(self, user_path: str, content: str, durability: str = None, timeout: float = None) -> bool:
+        return await self._run(OperationClass.IO, self.file_manager.write_file, user_path, content, durability,
+                               timeout=timeout)
+    
+    async def append_file(self, user_path: str, content: str, durability: str = None, timeout: float = None) -> bool:
+        return await self._run(OperationClass.IO, self.file_manager.append_file, user_path, content, durability,
+                               timeout=timeout)
+    
+    async def delete_file(self, user_path: str, timeout: float = None) -> bool:
+        return await self._run(OperationClass.IO, self.file_manager.delete_file, user_path, timeout=timeout)
+    
+    async def copy_file(self, src_path: str, dst_path: str, overwrite: bool = False, timeout: float = None) -> bool:
+        return await self._run(OperationClass.IO, self.file_manager.copy_file, src_path, dst_path, overwrite,
+                               timeout=timeout)
+    
+    async def move_file(self, src_path: str, dst_path: str, overwrite: bool = False, timeout: float = None) -> bool:
+        return await self._run(OperationClass.IO, self.file_manager.move_file, src_path, dst_path, overwrite,
+                               timeout=timeout)
+    
+    # === ZIP АРХИВЫ ===
+    
+    async def create_zip(self, source_paths: list, zip_path: str, parallel: bool = False,
+                         timeout: float = None) -> bool:
+        zip_handler = self._require(self.zip_handler, "ZipHandler")
+        return await self._run(OperationClass.ARCHIVE, zip_handler.create_zip, source_paths, zip_path,
+                               parallel, timeout=timeout)
+    
+    async def stream_zip(self, source_paths: list, sink, timeout: float = None) -> dict:
+        zip_handler = self._require(self.zip_handler, "ZipHandler")
+        return await self._run(OperationClass.ARCHIVE, zip_handler.stream_zip, source_paths, sink, timeout=timeout)
+    
+    async def extract_zip(self, zip_path: str, extract_path: str = "", timeout: float = None) -> bool:
+        zip_handler = self._require(self.zip_handler, "ZipHandler")
+        return await self._run(OperationClass.ARCHIVE, zip_handler.extract_zip, zip_path, extract_path,
+                               timeout=timeout)
+    
+    async def get_zip_info(self, zip_path: str, timeout: float = None) -> dict:
+        zip_handler = self._require(self.zip_handler, "ZipHandler")
+        return await self._run(OperationClass.ARCHIVE, zip_handler.get_zip_info, zip_path, timeout=timeout)
+    
+    # === JSON/XML ===
+    
+    async def read_json(self, file_path: str, timeout: float = None):
+        handler = self._require(self.json_xml_handler, "JSONXMLHandler")
+        return await self._run(OperationClass.PARSE, handler.read_json, file_path, timeout=timeout)
+    
+    async def write_json(self, file_path: str, data, timeout: float = None) -> bool:
+        handler = self._require(self.json_xml_handler, "JSONXMLHandler")
+        return await self._run(OperationClass.PARSE, handler.write_json, file_path, data, timeout=timeout)
+    
+    async def read_xml(self, file_path: str, timeout: float = None):
+        handler = self._require(self.json_xml_handler, "JSONXMLHandler")
+        return await self._run(OperationClass.PARSE, handler.read_xml, file_path, timeout=timeout)
+    
+    async def write_xml(self, file_path: str, data: dict, root_tag: str = "root", timeout: float = None) -> bool:
+        handler = self._require(self.json_xml_handler, "JSONXMLHandler")
+        return await self._run(OperationClass.PARSE, handler.write_xml, file_path, data, root_tag, timeout=timeout)
@@ -0,0 +1,80 @@
+﻿import bz2
+import zipfile
+import zlib
+from pathlib import Path
+from config import Config
+
+
+class CompressionPolicy:
+    """Адаптивный выбор метода сжатия для каждого члена ZIP архива.
+    
+    Сжимаемость файла оценивается по первому блоку (sample_size байт), сжатому
+    DEFLATE уровня 1. Уже сжатые данные (медиа, архивы) и крошечные файлы
+    сохраняются без сжатия (STORED), остальное сжимается методом, зависящим от
+    режима:
+    
+    - speed    - DEFLATE уровня 1;
+    - balanced - DEFLATE уровня deflate_level, BZIP2 для хорошо сжимаемого текста;
+    - size     - лучший по размеру на образце из DEFLATE 9, BZIP2 и LZMA.
+    
+    Решение - кортеж (метод zipfile, уровень или None).
+    """
+    
+    SPEED = "speed"
+    BALANCED = "balanced"
+    SIZE = "size"
+    ALL = (SPEED, BALANCED, SIZE)
+    
+    def __init__(self, mode: str = None, sample_size: int = None, store_ratio: float = None,
+                 text_ratio: float = None, deflate_level: int = None, min_size: int = None,
+                 stored_extensions=None):
+        self.mode = mode or Config.ZIP_COMPRESSION_POLICY
+        if self.mode not in self.ALL:
+            raise ValueError(f"Неизвестный режим сжатия: {self.mode}")
+        
+        self.sample_size = sample_size or Config.ZIP_SAMPLE_SIZE
+        self.store_ratio = store_ratio if store_ratio is not None else Config.ZIP_STORE_RATIO
+        self.text_ratio = text_ratio if text_ratio is not None else Config.ZIP_TEXT_RATIO
+        self.deflate_level = deflate_level if deflate_level is not None else Config.ZIP_DEFLATE_LEVEL
+        self.min_size = min_size if min_size is not None else Config.ZIP_MIN_COMPRESS_SIZE
+        self.stored_extensions = frozenset(
+            stored_extensions if stored_extensions is not None else Config.ZIP_STORED_EXTENSIONS
+        )
+    
+    def choose(self, path: Path, size: int) -> tuple:
+        """Метод и уровень сжатия для файла path размером size"""
+        if size < self.min_size or path.suffix.lower() in self.stored_extensions:
+            return zipfile.ZIP_STORED, None
+        
+        with open(path, 'rb') as f:
+            sample = f.read(self.sample_size)
+        if not sample:
+            return zipfile.ZIP_STORED, None
+        
+        ratio = len(zlib.compress(sample, 1)) / len(sample)
+        if ratio >= self.store_ratio:
+            return zipfile.ZIP_STORED, None
+        
+        if self.mode == self.SPEED:
+            return zipfile.ZIP_DEFLATED, 1
+        
+        if self.mode == self.BALANCED:
+            if ratio <= self.text_ratio:
+                return zipfile.ZIP_BZIP2, 9
+            return zipfile.ZIP_DEFLATED, self.deflate_level
+        
+        # Режим size: пробное сжатие образца всеми методами
+        candidates = [
+            (len(zlib.compress(sample, 9)), zipfile.ZIP_DEFLATED, 9),
+            (len(bz2.compress(sample, 9)), zipfile.ZIP_BZIP2, 9),
+            (len(_lzma_compress(sample)), zipfile.ZIP_LZMA, None),
+        ]
+        _, method, level = min(candidates, key=lambda candidate: candidate[0])
+        return method, level
+
+
+
+def _lzma_compress(data: bytes) -> bytes:
+    """Сжатие LZMA в формате члена ZIP (с заголовком свойств, как у zipfile)"""
+    compressor = zipfile.LZMACompressor()
+    return compressor.compress(data) + compressor.flush()
@@ -0,0 +1,196 @@
+﻿import hashlib
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path
+from config import Config
+from file_operations.tree_walker import ParallelTreeWalker
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+class ContentHashIndex:
+    """Постоянный индекс BLAKE2-хешей содержимого файлов под Config.BASE_DIR.
+    
+    Хеш хранится вместе с (size, mtime_ns, inode); файл перечитывается, только
+    если эти значения изменились, поэтому повторное сканирование неизмененного
+    дерева стоит столько же, сколько обход со stat. Удаленные файлы остаются в
+    индексе как записи с deleted = 1, чтобы запросы "что изменилось с момента T"
+    видели и удаления.
+    """
+    
+    def __init__(self, db_path: str = None, tree_walker: ParallelTreeWalker = None, max_workers: int = None):
+        self.db_path = db_path or Config.HASH_DB_PATH
+        self.tree_walker = tree_walker or ParallelTreeWalker()
+        self.max_workers = max_workers or Config.HASH_MAX_WORKERS
+        self._lock = threading.Lock()  # Одно сканирование за раз
+        self.init_database()
+    
+    def init_database(self):
+        """Создание таблицы индекса"""
+        with self.transaction() as cursor:
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS file_hashes (
+                    path TEXT PRIMARY KEY,
+                    size INTEGER NOT NULL,
+                    mtime_ns INTEGER NOT NULL,
+                    inode INTEGER NOT NULL,
+                    digest TEXT,
+                    deleted BOOLEAN DEFAULT 0,
+                    changed_at REAL NOT NULL
+                )
+            ''')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_file_hashes_changed ON file_hashes(changed_at)')
+    
+    @contextmanager
+    def transaction(self):
+        """Контекстный менеджер для транзакций"""
+        conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        cursor = conn.cursor()
+        
+        try:
+            yield cursor
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            raise e
+        finally:
+            conn.close()
+    
+    @staticmethod
+    def hash_file(path: Path) -> tuple:
+        """BLAKE2b-хеш файла и его stat до чтения; None, если файл менялся во время чтения"""
+        digest = hashlib.blake2b()
+        buffer = bytearray(HASH_CHUNK_SIZE)
+        view = memoryview(buffer)
+        
+        with open(path, 'rb') as f:
+            before = os.fstat(f.fileno())
+            while True:
+                read = f.readinto(buffer)
+                if not read:
+                    break
+                digest.update(view[:read])
+            after = os.fstat(f.fileno())
+        
+        if (before.st_size, before.st_mtime_ns) != (after.st_size, after.st_mtime_ns):
+            return None, after
+        return digest.hexdigest(), before
+    
+    def scan(self, root: Path = None) -> dict:
+        """Обновление индекса для поддерева root; возвращает сводку изменений"""
+        base_dir = Config.BASE_DIR.resolve()
+        root = Path(root).resolve() if root else base_dir
+        if not root.is_relative_to(base_dir):
+            raise ValueError(f"Путь {root} вне базового каталога")
+        
+        with self._lock:
+            scan_time = time.time()
+            known = self._load(self._relative(root, base_dir))
+            summary = {'scanned': 0, 'added': 0, 'modified': 0, 'removed': 0, 'unchanged': 0, 'skipped': 0}
+            
+            # Обход со stat: хешируются только файлы с изменившимися метаданными
+            changed = []
+            seen = set()
+            files = [(root, root.stat())] if root.is_file() else self.tree_walker.iter_files(root)
+            for path, file_stat in files:
+                relative = self._relative(path, base_dir)
+                seen.add(relative)
+                summary['scanned'] += 1
+                
+                row = known.get(relative)
+                if row and not row['deleted'] and (row['size'], row['mtime_ns'], row['inode']) == \
+                        (file_stat.st_size, file_stat.st_mtime_ns, file_stat.st_ino):
+                    summary['unchanged'] += 1
+                    continue
+                
+                changed.append((relative, path, row is not None and not row['deleted']))
+            
+            # Параллельное хеширование (hashlib отпускает GIL на больших блоках)
+            def hash_one(item):
+                try:
+                    return item, self.hash_file(item[1])
+                except OSError:
+                    return item, (None, None)
+            
+            updates = []
+            with ThreadPoolExecutor(self.max_workers) as pool:
+                for (relative, _path, existed), (digest, file_stat) in pool.map(hash_one, changed):
+                    if digest is None:
+                        # Файл изменился или исчез во время чтения - до следующего сканирования
+                        summary['skipped'] += 1
+                        continue
+                    changed_at = scan_time
+                    if existed and known[relative]['digest'] == digest:
+                        # Изменились только метаданные (touch, копия поверх той же) -
+                        # обновляется ключ stat, время изменения содержимого остается прежним
+                        summary['unchanged'] += 1
+                        changed_at = known[relative]['changed_at']
+                    else:
+                        summary['modified' if existed else 'added'] += 1
+                    updates.append((relative, file_stat.st_size, file_stat.st_mtime_ns, file_stat.st_ino,
+                                    digest, changed_at))
+            
+            removed = [(scan_time, relative) for relative, row in known.items()
+                       if relative not in seen and not row['deleted']]
+            summary['removed'] = len(removed)
+            
+            with self.transaction() as cursor:
+                cursor.executemany('''
+                    INSERT OR REPLACE INTO file_hashes (path, size, mtime_ns, inode, digest, deleted, changed_at)
+                    VALUES (?, ?, ?, ?, ?, 0, ?)
+                ''', updates)
+                cursor.executemany(
+                    "UPDATE file_hashes SET deleted = 1, digest = NULL, changed_at = ? WHERE path = ?",
+                    removed
+                )
+            
+            summary['scan_time'] = scan_time
+            return summary
+    
+    def changed_since(self, timestamp: float, include_deleted: bool = True) -> list:
+        """Файлы, добавленные, измененные или удаленные после timestamp"""
+        query = "SELECT path, size, digest, deleted, changed_at FROM file_hashes WHERE changed_at > ?"
+        if not include_deleted:
+            query += " AND deleted = 0"
+        query += " ORDER BY changed_at, path"
+        
+        with self.transaction() as cursor:
+            cursor.execute(query, (timestamp,))
+            return [dict(row) for row in cursor.fetchall()]
+    
+    def get_digest(self, user_path: str):
+        """Хеш файла по пути относительно базового каталога (None, если неизвестен)"""
+        with self.transaction() as cursor:
+            cursor.execute("SELECT digest FROM file_hashes WHERE path = ? AND deleted = 0", (user_path,))
+            row = cursor.fetchone()
+            return row['digest'] if row else None
+    
+    def find_duplicates(self) -> list:
+        """Группы файлов с одинаковым содержимым"""
+        with self.transaction() as cursor:
+            cursor.execute('''
+                SELECT digest, GROUP_CONCAT(path, '\n') AS paths FROM file_hashes
+                WHERE deleted = 0 GROUP BY digest, size HAVING COUNT(*) > 1
+            ''')
+            return [{'digest': row['digest'], 'paths': row['paths'].split('\n')} for row in cursor.fetchall()]
+    
+    def _load(self, prefix: str) -> dict:
+        """Записи индекса для поддерева (диапазонный запрос по первичному ключу)"""
+        with self.transaction() as cursor:
+            if prefix:
+                cursor.execute('''
+                    SELECT * FROM file_hashes WHERE path = ? OR (path >= ? AND path < ?)
+                ''', (prefix, prefix + '/', prefix + '0'))
+            else:
+                cursor.execute("SELECT * FROM file_hashes")
+            return {row['path']: row for row in cursor.fetchall()}
+    
+    @staticmethod
+    def _relative(path: Path, base_dir: Path) -> str:
+        relative = path.relative_to(base_dir).as_posix()
+        return '' if relative == '.' else relative
@@ -0,0 +1,155 @@
+﻿import os
+import re
+import shutil
+import threading
+import time
+from pathlib import Path
+from config import Config
+
+MOUNTINFO_PATH = "/proc/self/mountinfo"
+_OCTAL_ESCAPE = re.compile(r'\\([0-7]{3})')
+
+
+class DiskInfoProvider:
+    """Сведения о дисках через os.statvfs и /proc/self/mountinfo.
+    
+    Возвращает точные значения в байтах и использование inode без запуска
+    внешних процессов. Результаты statvfs кешируются по точкам монтирования
+    на ttl секунд, чтобы частый опрос статуса не нагружал систему.
+    """
+    
+    def __init__(self, ttl: float = None):
+        self.ttl = Config.DISK_INFO_TTL if ttl is None else ttl
+        self._lock = threading.Lock()
+        self._mounts = None
+        self._mounts_time = 0.0
+        self._usage = {}  # точка монтирования -> (время, сведения)
+    
+    def get_disk_info(self) -> list:
+        """Сведения обо всех реальных файловых системах (аналог df)"""
+        if not os.path.exists(MOUNTINFO_PATH) or not hasattr(os, 'statvfs'):
+            return [self._disk_usage_fallback(Config.BASE_DIR)]
+        
+        result = []
+        for mount in self._get_mounts():
+            info = self._get_usage(mount)
+            # Псевдо-ФС (proc, sysfs, cgroup...) не имеют блоков, df их тоже скрывает
+            if info is not None and info['total_bytes'] > 0:
+                result.append(info)
+        return result
+    
+    def info_for_path(self, path: Path) -> dict:
+        """Сведения о файловой системе, на которой расположен путь"""
+        if not os.path.exists(MOUNTINFO_PATH) or not hasattr(os, 'statvfs'):
+            return self._disk_usage_fallback(path)
+        
+        path = Path(path).resolve()
+        best = None
+        for mount in self._get_mounts():
+            mount_point = Path(mount['mounted_on'])
+            if path.is_relative_to(mount_point):
+                if best is None or len(mount_point.parts) >= len(Path(best['mounted_on']).parts):
+                    best = mount
+        
+        info = self._get_usage(best) if best else None
+        return info or self._disk_usage_fallback(path)
+    
+    def invalidate(self):
+        """Сброс кеша (например, после крупной записи)"""
+        with self._lock:
+            self._mounts = None
+            self._usage.clear()
+    
+    def _get_mounts(self) -> list:
+        now = time.monotonic()
+        with self._lock:
+            if self._mounts is not None and now - self._mounts_time < self.ttl:
+                return self._mounts
+        
+        mounts = self._parse_mountinfo()
+        with self._lock:
+            self._mounts = mounts
+            self._mounts_time = now
+        return mounts
+    
+    def _parse_mountinfo(self) -> list:
+        """Разбор /proc/self/mountinfo (формат описан в proc(5))"""
+        # Более поздние записи перекрывают ранние монтирования в той же точке
+        mounts = {}
+        with open(MOUNTINFO_PATH, 'r', encoding='utf-8', errors='replace') as f:
+            for line in f:
+                fields = line.split()
+                try:
+                    separator = fields.index('-')
+                except ValueError:
+                    continue
+                
+                if separator < 5 or len(fields) < separator + 3:
+                    continue
+                
+                mount_point = self._unescape(fields[4])
+                mounts.pop(mount_point, None)
+                mounts[mount_point] = {
+                    'mounted_on': mount_point,
+                    'fs_type': fields[separator + 1],
+                    'filesystem': self._unescape(fields[separator + 2]),
+                    'device': fields[2]
+                }
+        return list(mounts.values())
+    
+    @staticmethod
+    def _unescape(value: str) -> str:
+        # Пробелы и спецсимволы в путях экранируются восьмеричными кодами (\040)
+        return _OCTAL_ESCAPE.sub(lambda m: chr(int(m.group(1), 8)), value)
+    
+    def _get_usage(self, mount: dict):
+        mount_point = mount['mounted_on']
+        now = time.monotonic()
+        with self._lock:
+            cached = self._usage.get(mount_point)
+            if cached and now - cached[0] < self.ttl:
+                return cached[1]
+        
+        try:
+            st = os.statvfs(mount_point)
+        except OSError:
+            return None
+        
+        total = st.f_blocks * st.f_frsize
+        free = st.f_bfree * st.f_frsize
+        available = st.f_bavail * st.f_frsize
+        used = total - free
+        
+        info = {
+            'filesystem': mount['filesystem'],
+            'fs_type': mount['fs_type'],
+            'mounted_on': mount_point,
+            'total_bytes': total,
+            'used_bytes': used,
+            'available_bytes': available,
+            # Как в df: доля от места, доступного непривилегированным пользователям
+            'use_percent': used / (used + available) * 100 if used + available else 0.0,
+            'inodes_total': st.f_files,
+            'inodes_used': st.f_files - st.f_ffree,
+            'inodes_free': st.f_favail
+        }
+        
+        with self._lock:
+            self._usage[mount_point] = (now, info)
+        return info
+    
+    def _disk_usage_fallback(self, path: Path) -> dict:
+        """Запасной вариант для платформ без statvfs (Windows)"""
+        usage = shutil.disk_usage(path)
+        return {
+            'filesystem': 'Local',
+            'fs_type': None,
+            'mounted_on': str(path),
+            'total_bytes': usage.total,
+            'used_bytes': usage.used,
+            'available_bytes': usage.free,
+            'use_percent': usage.used / usage.total * 100 if usage.total else 0.0,
+            'inodes_total': None,
+            'inodes_used': None,
+            'inodes_free': None
+        }
@@ -0,0 +1,109 @@
+﻿import threading
+import zlib
+from contextlib import contextmanager, ExitStack
+from pathlib import Path
+
+
+class ReadWriteLock:
+    """Блокировка с разделяемым (чтение) и монопольным (запись) режимами.
+    
+    Писатели имеют приоритет: пока писатель ожидает, новые читатели не входят,
+    поэтому постоянный поток чтений не может бесконечно откладывать запись.
+    """
+    
+    def __init__(self):
+        self._cond = threading.Condition(threading.Lock())
+        self._readers = 0
+        self._writer = False
+        self._waiting_writers = 0
+    
+    def acquire_read(self):
+        with self._cond:
+            while self._writer or self._waiting_writers:
+                self._cond.wait()
+            self._readers += 1
+    
+    def release_read(self):
+        with self._cond:
+            self._readers -= 1
+            if self._readers == 0:
+                self._cond.notify_all()
+    
+    def acquire_write(self):
+        with self._cond:
+            self._waiting_writers += 1
+            try:
+                while self._writer or self._readers:
+                    self._cond.wait()
+            finally:
+                self._waiting_writers -= 1
+            self._writer = True
+    
+    def release_write(self):
+        with self._cond:
+            self._writer = False
+            self._cond.notify_all()
+    
+    @contextmanager
+    def read_lock(self):
+        """Разделяемая блокировка на время чтения"""
+        self.acquire_read()
+        try:
+            yield
+        finally:
+            self.release_read()
+    
+    @contextmanager
+    def write_lock(self):
+        """Монопольная блокировка на время записи или удаления"""
+        self.acquire_write()
+        try:
+            yield
+        finally:
+            self.release_write()
+
+
+class StripedLockTable:
+    """Таблица блокировок фиксированного размера.
+    
+    Путь отображается на одну из stripes блокировок по хешу, поэтому память
+    не растет с числом файлов. Разные пути могут делить одну блокировку -
+    это лишь снижает параллелизм, но не нарушает корректность.
+    """
+    
+    def __init__(self, stripes: int = 256):
+        if stripes < 1:
+            raise ValueError("Количество блокировок должно быть положительным")
+        self._locks = [ReadWriteLock() for _ in range(stripes)]
+    
+    def __len__(self) -> int:
+        return len(self._locks)
+    
+    def _index(self, path: Path) -> int:
+        # crc32 стабилен между запусками, в отличие от hash() для строк
+        return zlib.crc32(str(path).encode('utf-8')) % len(self._locks)
+    
+    def get(self, path: Path) -> ReadWriteLock:
+        """Получение блокировки, отвечающей за путь"""
+        return self._locks[self._index(path)]
+    
+    @contextmanager
+    def acquire_many(self, read_paths=(), write_paths=()):
+        """Захват блокировок нескольких путей в порядке номеров (без взаимоблокировок).
+        
+        Если на одну блокировку приходятся и чтение, и запись, берется запись.
+        """
+        modes = {}
+        for path in read_paths:
+            modes.setdefault(self._index(path), 'r')
+        for path in write_paths:
+            modes[self._index(path)] = 'w'
+        
+        with ExitStack() as stack:
+            for index in sorted(modes):
+                lock = self._locks[index]
+                if modes[index] == 'w':
+                    stack.enter_context(lock.write_lock())
+                else:
+                    stack.enter_context(lock.read_lock())
+            yield
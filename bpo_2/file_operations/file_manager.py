@@ -1,45 +1,137 @@
 ﻿import os
+import errno
+import heapq
+import mmap
 import shutil
-import threading
+import stat
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from pathlib import Path
 from security.path_validator import PathValidator, PathTraversalError
 from config import Config
 from database.models import OperationType
+from file_operations.file_locks import ReadWriteLock, StripedLockTable
+from file_operations.metadata_cache import DirectoryMetadataCache
+from file_operations.disk_info import DiskInfoProvider
+from file_operations.tree_walker import ParallelTreeWalker
+from file_operations.quota_manager import QuotaManager
+
+# Размер порции для копирования средствами ядра (copy_file_range/sendfile)
+COPY_CHUNK_SIZE = 64 * 1024 * 1024
+# Ошибки, при которых системный вызов копирования не поддерживается для пары файлов
+_COPY_FALLBACK_ERRNOS = {errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP, errno.EBADF}
+
+# Ключи сортировки листинга директорий
+LISTING_SORT_KEYS = {
+    'name': lambda item: (not item['is_dir'], item['name']),
+    'size': lambda item: item['size'],
+    'mtime': lambda item: item['modified'],
+}
+
+class DurabilityMode:
+    """Режимы надежности записи файлов"""
+    FAST = "fast"            # Атомарная замена без fsync и без резервной копии
+    SAFE = "safe"            # fsync файла до замены и каталога после нее
+    VERSIONED = "versioned"  # Хранение Config.WRITE_BACKUP_COUNT резервных копий
+    ALL = (FAST, SAFE, VERSIONED)
 
 class FileManager:
-    def __init__(self, db_operations, path_validator: PathValidator):
+    def __init__(self, db_operations, path_validator: PathValidator,
+                 metadata_cache: DirectoryMetadataCache = None, quota_manager: QuotaManager = None):
         self.db_operations = db_operations
         self.validator = path_validator
-        self.locks = {}  # Для предотвращения race conditions
-        self.lock = threading.Lock()  # Блокировка для управления доступом к locks
+        self.metadata_cache = metadata_cache  # Необязательный кеш листингов директорий
+        self.quota_manager = quota_manager    # Необязательный учет квот пользователей
+        self.disk_info = DiskInfoProvider()
+        self.tree_walker = ParallelTreeWalker()
+        # Ограниченная таблица блокировок чтения/записи вместо словаря на каждый путь
+        self.locks = StripedLockTable(Config.LOCK_STRIPES)
     
-    def _get_file_lock(self, file_path: Path) -> threading.Lock:
+    def _get_file_lock(self, file_path: Path) -> ReadWriteLock:
         """Получение блокировки для файла (предотвращение race conditions)"""
-        with self.lock:
-            if file_path not in self.locks:
-                self.locks[file_path] = threading.Lock()
-            return self.locks[file_path]
+        return self.locks.get(file_path)
+    
+    def _lock_paths(self, read_paths=(), write_paths=()):
+        """Захват блокировок нескольких файлов в фиксированном порядке (без взаимоблокировок)"""
+        return self.locks.acquire_many(read_paths, write_paths)
+    
+    def _invalidate_cache(self, *paths: Path):
+        """Сброс записей кеша метаданных, затронутых изменением путей"""
+        if self.metadata_cache:
+            for path in paths:
+                self.metadata_cache.invalidate(path)
+    
+    @contextmanager
+    def _quota_reservation(self, safe_path: Path, delta: int):
+        """Резерв квоты на время операции; при ошибке резерв отменяется"""
+        if not self.quota_manager or delta == 0:
+            yield
+            return
+        
+        self.quota_manager.reserve(safe_path, delta)
+        try:
+            yield
+        except BaseException:
+            self.quota_manager.release(safe_path, delta)
+            raise
+    
+    def _path_size(self, path: Path) -> int:
+        """Объем файла или поддерева в байтах (для учета квот)"""
+        if path.is_file():
+            return path.stat().st_size
+        if path.is_dir():
+            return sum(record['size'] for record in self.tree_walker.walk(path))
+        return 0
     
     def list_directory(self, user_path: str = "") -> list:
         """Безопасное получение списка файлов в директории"""
         try:
-            safe_path = self.validator.validate_path(user_path)
+            items = sorted(self.iter_directory(user_path), key=LISTING_SORT_KEYS['name'])
             
-            if not safe_path.exists():
-                raise FileNotFoundError(f"Директория {user_path} не существует")
+            # Логирование операции
+            if self.db_operations:
+                user = self.db_operations.get_current_user()
+                self.db_operations.log_operation(
+                    OperationType.READ, 
+                    user.id, 
+                    details=f"Просмотр директории: {user_path}"
+                )
+            
+            return items
+        
+        except (PathTraversalError, FileNotFoundError, NotADirectoryError) as e:
+            raise e
+    
+    def iter_directory(self, user_path: str = ""):
+        """Потоковый обход директории без сортировки (os.scandir, один stat на элемент)"""
+        safe_path = self._resolve_directory(user_path)
+        
+        if self.metadata_cache:
+            return iter(self.metadata_cache.get_listing(safe_path, lambda: list(self._scan_directory(safe_path))))
+        
+        return self._scan_directory(safe_path)
+    
+    def list_directory_page(self, user_path: str = "", offset: int = 0, limit: int = 100,
+                            sort_by: str = 'name', reverse: bool = False) -> dict:
+        """Страница листинга директории, отсортированного по name, size или mtime.
+        
+        Хранится только offset + limit элементов (O(n log k) вместо полной сортировки).
+        """
+        try:
+            if offset < 0 or limit < 0:
+                raise ValueError("Смещение и размер страницы должны быть неотрицательными")
+            
+            key = self._get_sort_key(sort_by)
+            counter = {'total': 0}
             
-            if not safe_path.is_dir():
-                raise NotADirectoryError(f"{user_path} не является директорией")
+            def counted(items):
+                for item in items:
+                    counter['total'] += 1
+                    yield item
             
-            items = []
-            for item in safe_path.iterdir():
-                item_info = {
-                    'name': item.name,
-                    'is_dir': item.is_dir(),
-                    'size': item.stat().st_size if item.is_file() else 0,
-                    'modified': item.stat().st_mtime
-                }
-                items.append(item_info)
+            select = heapq.nlargest if reverse else heapq.nsmallest
+            top = select(offset + limit, counted(self.iter_directory(user_path)), key=key)
             
             # Логирование операции
             if self.db_operations:
@@ -47,21 +139,85 @@ class FileManager:
                 self.db_operations.log_operation(
                     OperationType.READ, 
                     user.id, 
-                    details=f"Просмотр директории: {user_path}"
+                    details=f"Просмотр директории: {user_path} (страница {offset}:{offset + limit})"
                 )
             
-            return sorted(items, key=lambda x: (not x['is_dir'], x['name']))
+            return {
+                'items': top[offset:],
+                'offset': offset,
+                'limit': limit,
+                'total': counter['total']
+            }
         
-        except (PathTraversalError, FileNotFoundError, NotADirectoryError) as e:
+        except Exception as e:
             raise e
     
+    def top_k(self, user_path: str = "", k: int = 10, sort_by: str = 'size') -> list:
+        """k наибольших элементов директории по выбранному ключу"""
+        key = self._get_sort_key(sort_by)
+        return heapq.nlargest(k, self.iter_directory(user_path), key=key)
+    
+    def _get_sort_key(self, sort_by: str):
+        """Функция ключа сортировки листинга"""
+        if sort_by not in LISTING_SORT_KEYS:
+            raise ValueError(f"Неизвестный ключ сортировки: {sort_by}")
+        return LISTING_SORT_KEYS[sort_by]
+    
+    def _resolve_directory(self, user_path: str) -> Path:
+        """Валидация пути директории"""
+        safe_path = self.validator.validate_path(user_path)
+        self._check_directory(safe_path, user_path)
+        return safe_path
+    
+    def _check_directory(self, safe_path: Path, user_path: str):
+        """Проверка, что путь - существующая директория (по кешу, если он есть)"""
+        if self.metadata_cache and self.metadata_cache.is_dir(safe_path):
+            return
+        
+        if not safe_path.exists():
+            raise FileNotFoundError(f"Директория {user_path} не существует")
+        
+        if not safe_path.is_dir():
+            raise NotADirectoryError(f"{user_path} не является директорией")
+    
+    def _scan_directory(self, safe_path: Path):
+        """Генератор сведений об элементах директории"""
+        with os.scandir(safe_path) as entries:
+            for entry in entries:
+                try:
+                    yield self._entry_info(entry)
+                except FileNotFoundError:
+                    # Элемент удален во время обхода
+                    continue
+    
+    def _entry_info(self, entry: os.DirEntry) -> dict:
+        """Сведения об элементе: тип берется из d_type, stat кешируется в DirEntry"""
+        is_dir = entry.is_dir()
+        entry_stat = entry.stat()
+        return {
+            'name': entry.name,
+            'is_dir': is_dir,
+            'size': entry_stat.st_size if entry.is_file() else 0,
+            'modified': entry_stat.st_mtime
+        }
+    
     def read_file(self, user_path: str) -> str:
-        """Безопасное чтение файла"""
+        """Безопасное чтение текстового файла (UTF-8) поверх read_bytes"""
+        content = self.read_bytes(user_path).decode('utf-8')
+        
+        # Универсальные переводы строк, как при чтении в текстовом режиме
+        if '\r' in content:
+            content = content.replace('\r\n', '\n').replace('\r', '\n')
+        
+        return content
+    
+    def read_bytes(self, user_path: str) -> bytes:
+        """Безопасное чтение файла в виде bytes (одно выделение памяти, без декодирования)"""
         try:
             safe_path = self.validator.validate_path(user_path)
             file_lock = self._get_file_lock(safe_path)
             
-            with file_lock:  # Защита от race conditions
+            with file_lock.read_lock():  # Защита от race conditions
                 if not safe_path.exists():
                     raise FileNotFoundError(f"Файл {user_path} не существует")
                 
@@ -71,7 +227,7 @@ class FileManager:
                 if safe_path.stat().st_size > Config.MAX_FILE_SIZE:
                     raise ValueError("Файл слишком большой")
                 
-                with open(safe_path, 'r', encoding='utf-8') as f:
+                with open(safe_path, 'rb') as f:
                     content = f.read()
                 
                 # Логирование
@@ -88,37 +244,215 @@ class FileManager:
         except Exception as e:
             raise e
     
-    def write_file(self, user_path: str, content: str) -> bool:
-        """Безопасная запись в файл"""
+    def readinto(self, user_path: str, buffer, offset: int = 0) -> int:
+        """Чтение файла с позиции offset в буфер вызывающего (bytearray, memoryview, mmap).
+        
+        Данные не копируются через промежуточные объекты; возвращает число прочитанных байтов.
+        """
         try:
+            view = memoryview(buffer).cast('B')
+            if view.readonly:
+                raise TypeError("Буфер должен быть доступен для записи")
+            
+            if offset < 0:
+                raise ValueError("Смещение должно быть неотрицательным")
+            
+            if view.nbytes > Config.MAX_FILE_SIZE:
+                raise ValueError("Запрошенный диапазон превышает максимальный размер")
+            
             safe_path = self.validator.validate_path(user_path)
             file_lock = self._get_file_lock(safe_path)
             
-            with file_lock:
-                # Проверка размера контента
-                if len(content.encode('utf-8')) > Config.MAX_FILE_SIZE:
-                    raise ValueError("Содержимое файла превышает максимальный размер")
+            with file_lock.read_lock():
+                if not safe_path.exists():
+                    raise FileNotFoundError(f"Файл {user_path} не существует")
                 
-                # Создание родительских директорий
-                safe_path.parent.mkdir(parents=True, exist_ok=True)
+                if not safe_path.is_file():
+                    raise IsADirectoryError(f"{user_path} является директорией")
                 
-                # Атомарная запись во временный файл с последующим перемещением
-                temp_path = safe_path.with_suffix('.tmp')
+                total = 0
+                with open(safe_path, 'rb', buffering=0) as f:
+                    f.seek(offset)
+                    while total < view.nbytes:
+                        read = f.readinto(view[total:])
+                        if not read:
+                            break
+                        total += read
                 
-                with open(temp_path, 'w', encoding='utf-8') as f:
-                    f.write(content)
+                # Логирование
+                if self.db_operations:
+                    user = self.db_operations.get_current_user()
+                    self.db_operations.log_operation(
+                        OperationType.READ, 
+                        user.id, 
+                        details=f"Чтение файла в буфер: {user_path} [{offset}:{offset + total}]"
+                    )
                 
-                # Атомарная замена файла
-                if safe_path.exists():
-                    backup_path = safe_path.with_suffix('.bak')
-                    safe_path.replace(backup_path)
+                return total
+        
+        except Exception as e:
+            raise e
+    
+    def read_range(self, user_path: str, offset: int, length: int) -> bytes:
+        """Чтение диапазона байтов файла (стоимость пропорциональна длине диапазона)"""
+        try:
+            if offset < 0 or length < 0:
+                raise ValueError("Смещение и длина должны быть неотрицательными")
+            
+            # Ограничение размера относится к возвращаемому диапазону, а не к файлу
+            if length > Config.MAX_FILE_SIZE:
+                raise ValueError("Запрошенный диапазон превышает максимальный размер")
+            
+            safe_path = self.validator.validate_path(user_path)
+            file_lock = self._get_file_lock(safe_path)
+            
+            with file_lock.read_lock():
+                if not safe_path.exists():
+                    raise FileNotFoundError(f"Файл {user_path} не существует")
                 
-                temp_path.replace(safe_path)
+                if not safe_path.is_file():
+                    raise IsADirectoryError(f"{user_path} является директорией")
+                
+                with open(safe_path, 'rb') as f:
+                    f.seek(offset)
+                    data = f.read(length)
+                
+                # Логирование
+                if self.db_operations:
+                    user = self.db_operations.get_current_user()
+                    self.db_operations.log_operation(
+                        OperationType.READ, 
+                        user.id, 
+                        details=f"Чтение диапазона файла: {user_path} [{offset}:{offset + len(data)}]"
+                    )
+                
+                return data
+        
+        except Exception as e:
+            raise e
+    
+    def iter_chunks(self, user_path: str, chunk_size: int = None):
+        """Последовательное чтение файла порциями bytes (память не зависит от размера файла).
+        
+        Блокировка чтения удерживается только на время открытия файла, а не
+        между порциями: запись заменяет файл атомарно, поэтому открытый
+        дескриптор дочитывает прежнюю версию, и потребитель может писать
+        в любые файлы во время обхода.
+        """
+        chunk_size = chunk_size or Config.PARSE_CHUNK_SIZE
+        if chunk_size <= 0:
+            raise ValueError("Размер порции должен быть положительным")
+        
+        safe_path = self.validator.validate_path(user_path)
+        file_lock = self._get_file_lock(safe_path)
+        
+        with file_lock.read_lock():
+            if not safe_path.exists():
+                raise FileNotFoundError(f"Файл {user_path} не существует")
+            
+            if not safe_path.is_file():
+                raise IsADirectoryError(f"{user_path} является директорией")
+            
+            # Логирование
+            if self.db_operations:
+                user = self.db_operations.get_current_user()
+                self.db_operations.log_operation(
+                    OperationType.READ, 
+                    user.id, 
+                    details=f"Потоковое чтение файла: {user_path}"
+                )
+            
+            f = open(safe_path, 'rb')
+        
+        with f:
+            while True:
+                chunk = f.read(chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+    
+    def tail(self, user_path: str, n_lines: int = 10) -> str:
+        """Чтение последних строк файла обратным сканированием через mmap"""
+        try:
+            if n_lines < 0:
+                raise ValueError("Количество строк должно быть неотрицательным")
+            
+            safe_path = self.validator.validate_path(user_path)
+            file_lock = self._get_file_lock(safe_path)
+            
+            with file_lock.read_lock():
+                if not safe_path.exists():
+                    raise FileNotFoundError(f"Файл {user_path} не существует")
+                
+                if not safe_path.is_file():
+                    raise IsADirectoryError(f"{user_path} является директорией")
+                
+                data = b''
+                with open(safe_path, 'rb') as f:
+                    file_size = os.fstat(f.fileno()).st_size
+                    
+                    # Пустой файл нельзя отобразить в память
+                    if file_size > 0 and n_lines > 0:
+                        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                            start = self._find_tail_start(mm, file_size, n_lines)
+                            
+                            if file_size - start > Config.MAX_FILE_SIZE:
+                                raise ValueError("Запрошенный фрагмент превышает максимальный размер")
+                            
+                            data = mm[start:file_size]
                 
                 # Логирование
                 if self.db_operations:
                     user = self.db_operations.get_current_user()
-                    op_type = OperationType.MODIFY if safe_path.exists() else OperationType.CREATE
+                    self.db_operations.log_operation(
+                        OperationType.READ, 
+                        user.id, 
+                        details=f"Чтение последних {n_lines} строк файла: {user_path}"
+                    )
+                
+                return data.decode('utf-8', errors='replace')
+        
+        except Exception as e:
+            raise e
+    
+    def _find_tail_start(self, mm: mmap.mmap, file_size: int, n_lines: int) -> int:
+        """Поиск начала последних n_lines строк с конца файла"""
+        end = file_size
+        
+        # Завершающий перевод строки не образует отдельную строку
+        if mm[end - 1:end] == b'\n':
+            end -= 1
+        
+        for _ in range(n_lines):
+            # Сканирование назад прекращается, как только объем превысил лимит
+            if file_size - end > Config.MAX_FILE_SIZE:
+                break
+            
+            pos = mm.rfind(b'\n', 0, end)
+            if pos == -1:
+                return 0
+            end = pos
+        
+        return end + 1
+    
+    def write_file(self, user_path: str, content: str, durability: str = None) -> bool:
+        """Безопасная запись текста (UTF-8) поверх write_bytes"""
+        return self.write_bytes(user_path, content.encode('utf-8'), durability)
+    
+    def write_bytes(self, user_path: str, data, durability: str = None) -> bool:
+        """Безопасная запись bytes, bytearray или memoryview без копирования (см. DurabilityMode)"""
+        try:
+            durability = self._check_durability(durability)
+            safe_path = self.validator.validate_path(user_path)
+            file_lock = self._get_file_lock(safe_path)
+            
+            with file_lock.write_lock():
+                existed = self._write_locked(safe_path, data, durability)
+                
+                # Логирование
+                if self.db_operations:
+                    user = self.db_operations.get_current_user()
+                    op_type = OperationType.MODIFY if existed else OperationType.CREATE
                     self.db_operations.log_operation(
                         op_type, 
                         user.id, 
@@ -130,20 +464,168 @@ class FileManager:
         except Exception as e:
             raise e
     
+    def _check_durability(self, durability: str) -> str:
+        """Режим надежности записи по умолчанию и его проверка"""
+        durability = durability or Config.WRITE_DURABILITY
+        if durability not in DurabilityMode.ALL:
+            raise ValueError(f"Неизвестный режим надежности записи: {durability}")
+        return durability
+    
+    def _write_locked(self, safe_path: Path, data, durability: str) -> bool:
+        """Запись файла под уже захваченной блокировкой; возвращает, существовал ли файл"""
+        view = memoryview(data).cast('B')
+        
+        # Проверка размера контента
+        content_size = view.nbytes
+        if content_size > Config.MAX_FILE_SIZE:
+            raise ValueError("Содержимое файла превышает максимальный размер")
+        
+        # Создание родительских директорий
+        safe_path.parent.mkdir(parents=True, exist_ok=True)
+        existed = safe_path.exists()
+        
+        with self._quota_reservation(safe_path, self._write_delta(safe_path, content_size, durability, existed)):
+            # Атомарная запись во временный файл с последующим перемещением
+            with self._temp_file(safe_path) as temp_path:
+                with open(temp_path, 'xb') as f:
+                    f.write(view)
+                    if durability == DurabilityMode.SAFE:
+                        f.flush()
+                        os.fsync(f.fileno())
+                
+                # Сохранение предыдущих версий
+                if durability == DurabilityMode.VERSIONED and existed:
+                    self._rotate_backups(safe_path, Config.WRITE_BACKUP_COUNT)
+                
+                # Атомарная замена файла
+                temp_path.replace(safe_path)
+        
+        self._invalidate_cache(safe_path)
+        
+        if durability == DurabilityMode.SAFE:
+            self._fsync_directory(safe_path.parent)
+        
+        return existed
+    
+    @contextmanager
+    def _temp_file(self, safe_path: Path):
+        """Уникальное имя временного файла рядом с safe_path; файл удаляется, если не был перемещен.
+        
+        Имя включает полное имя файла и случайный суффикс, поэтому параллельные
+        записи rep.txt и rep.json не пересекаются и чужой rep.tmp не затирается.
+        """
+        temp_path = safe_path.with_name(f".{safe_path.name}.{uuid.uuid4().hex}.tmp")
+        try:
+            yield temp_path
+        finally:
+            if temp_path.exists():
+                temp_path.unlink()
+    
+    def _write_delta(self, safe_path: Path, new_size: int, durability: str, existed: bool) -> int:
+        """Изменение занятого места после записи (только при включенных квотах)"""
+        if not self.quota_manager:
+            return 0
+        
+        if durability == DurabilityMode.VERSIONED and existed and Config.WRITE_BACKUP_COUNT >= 1:
+            # Старая версия остается резервной копией, вытесняется только самая старая
+            oldest = self._backup_paths(safe_path, Config.WRITE_BACKUP_COUNT)[-1]
+            return new_size - (oldest.stat().st_size if oldest.exists() else 0)
+        
+        return new_size - (safe_path.stat().st_size if existed else 0)
+    
+    def append_file(self, user_path: str, content: str, durability: str = None) -> bool:
+        """Дозапись текста (UTF-8) в конец файла поверх append_bytes"""
+        return self.append_bytes(user_path, content.encode('utf-8'), durability)
+    
+    def append_bytes(self, user_path: str, data, durability: str = None) -> bool:
+        """Дозапись в конец файла без перезаписи существующего содержимого"""
+        try:
+            durability = self._check_durability(durability)
+            safe_path = self.validator.validate_path(user_path)
+            file_lock = self._get_file_lock(safe_path)
+            
+            with file_lock.write_lock():
+                data = memoryview(data).cast('B')
+                existed = safe_path.exists()
+                
+                if existed and not safe_path.is_file():
+                    raise IsADirectoryError(f"{user_path} является директорией")
+                
+                current_size = safe_path.stat().st_size if existed else 0
+                if current_size + data.nbytes > Config.MAX_FILE_SIZE:
+                    raise ValueError("Размер файла после дозаписи превысит максимальный")
+                
+                safe_path.parent.mkdir(parents=True, exist_ok=True)
+                
+                with self._quota_reservation(safe_path, data.nbytes):
+                    with open(safe_path, 'ab') as f:
+                        f.write(data)
+                        if durability == DurabilityMode.SAFE:
+                            f.flush()
+                            os.fsync(f.fileno())
+                
+                if durability == DurabilityMode.SAFE and not existed:
+                    self._fsync_directory(safe_path.parent)
+                
+                self._invalidate_cache(safe_path)
+                
+                # Логирование
+                if self.db_operations:
+                    user = self.db_operations.get_current_user()
+                    op_type = OperationType.MODIFY if existed else OperationType.CREATE
+                    self.db_operations.log_operation(
+                        op_type, 
+                        user.id, 
+                        details=f"Дозапись в файл: {user_path}"
+                    )
+                
+                return True
+        
+        except Exception as e:
+            raise e
+    
+    def _rotate_backups(self, safe_path: Path, count: int):
+        """Сдвиг резервных копий: <имя>.bak -> <имя>.bak1 -> ... (хранится не более count копий)"""
+        if count < 1:
+            return
+        
+        backups = self._backup_paths(safe_path, count)
+        
+        for older, newer in zip(reversed(backups[1:]), reversed(backups[:-1])):
+            if newer.exists():
+                newer.replace(older)
+        
+        safe_path.replace(backups[0])
+    
+    def _backup_paths(self, safe_path: Path, count: int) -> list:
+        """Имена резервных копий от новой к старой: <имя>.bak, <имя>.bak1, ...
+        
+        Суффикс добавляется к полному имени, чтобы у rep.txt и rep.json были разные копии.
+        """
+        backups = [safe_path.with_name(safe_path.name + '.bak')]
+        backups += [safe_path.with_name(f'{safe_path.name}.bak{i}') for i in range(1, count)]
+        return backups
+    
+    def _fsync_directory(self, directory: Path):
+        """Сброс на диск записи каталога (фиксирует переименование файла)"""
+        # В Windows каталог нельзя открыть как файл
+        if os.name == 'nt':
+            return
+        
+        dir_fd = os.open(directory, os.O_RDONLY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+    
     def delete_file(self, user_path: str) -> bool:
         """Безопасное удаление файла"""
         try:
             safe_path = self.validator.validate_path(user_path)
             file_lock = self._get_file_lock(safe_path)
             
-            with file_lock:
-                if not safe_path.exists():
-                    raise FileNotFoundError(f"Файл {user_path} не существует")
-                
-                if safe_path.is_file():
-                    safe_path.unlink()
-                else:
-                    shutil.rmtree(safe_path)
+            with file_lock.write_lock():
+                self._delete_locked(safe_path, user_path)
                 
                 # Логирование
                 if self.db_operations:
@@ -159,35 +641,438 @@ class FileManager:
         except Exception as e:
             raise e
     
-    def get_disk_info(self):
-        """Получение информации о дисках"""
-        try:
-            disk_info = []
-            for partition in os.popen('df -h').read().splitlines()[1:]:
-                parts = partition.split()
-                if len(parts) >= 6:
-                    disk_info.append({
-                        'filesystem': parts[0],
-                        'size': parts[1],
-                        'used': parts[2],
-                        'available': parts[3],
-                        'use_percent': parts[4],
-                        'mounted_on': parts[5]
-                    })
-            return disk_info
-        except:
-            # Альтернативная реализация для Windows
-            import shutil
-            base_dir = Config.BASE_DIR
-            usage = shutil.disk_usage(base_dir)
-            return [{
-                'filesystem': 'Local',
-                'size': f"{usage.total // (1024**3)}G",
-                'used': f"{usage.used // (1024**3)}G", 
-                'available': f"{usage.free // (1024**3)}G",
-                'use_percent': f"{(usage.used / usage.total * 100):.1f}%",
-                'mounted_on': str(base_dir)
-            }]
+    def _delete_locked(self, safe_path: Path, user_path: str):
+        """Удаление файла или директории под уже захваченной блокировкой"""
+        if not safe_path.exists():
+            raise FileNotFoundError(f"Файл {user_path} не существует")
+        
+        freed = self._path_size(safe_path) if self.quota_manager else 0
+        
+        if safe_path.is_file():
+            safe_path.unlink()
+        else:
+            shutil.rmtree(safe_path)
+        
+        if self.quota_manager:
+            self.quota_manager.charge(safe_path, -freed)
+        
+        self._invalidate_cache(safe_path)
+    
+    def copy_file(self, src_path: str, dst_path: str, overwrite: bool = False) -> bool:
+        """Копирование файла или директории без передачи данных через память Python"""
+        try:
+            safe_src = self.validator.validate_path(src_path)
+            safe_dst = self.validator.validate_path(dst_path)
+            
+            if safe_src == safe_dst:
+                raise ValueError("Источник и назначение совпадают")
+            
+            if safe_dst.is_relative_to(safe_src):
+                raise ValueError("Нельзя скопировать директорию внутрь самой себя")
+            
+            with self._lock_paths(read_paths=[safe_src], write_paths=[safe_dst]):
+                if not safe_src.exists():
+                    raise FileNotFoundError(f"Файл {src_path} не существует")
+                
+                if safe_dst.exists() and not overwrite:
+                    raise FileExistsError(f"{dst_path} уже существует")
+                
+                safe_dst.parent.mkdir(parents=True, exist_ok=True)
+                
+                delta = 0
+                if self.quota_manager:
+                    delta = self._path_size(safe_src) - self._path_size(safe_dst)
+                
+                with self._quota_reservation(safe_dst, delta):
+                    if safe_src.is_file():
+                        # Атомарная замена: копия сначала пишется во временный файл
+                        with self._temp_file(safe_dst) as temp_path:
+                            self._copy_file_data(safe_src, temp_path)
+                            temp_path.replace(safe_dst)
+                    else:
+                        if safe_dst.exists():
+                            raise IsADirectoryError(f"{dst_path} уже существует и не может быть перезаписан директорией")
+                        self._copy_tree(safe_src, safe_dst)
+                
+                self._invalidate_cache(safe_dst)
+                
+                # Логирование
+                if self.db_operations:
+                    user = self.db_operations.get_current_user()
+                    self.db_operations.log_operation(
+                        OperationType.CREATE, 
+                        user.id, 
+                        details=f"Копирование: {src_path} -> {dst_path}"
+                    )
+                
+                return True
+        
+        except Exception as e:
+            raise e
+    
+    def move_file(self, src_path: str, dst_path: str, overwrite: bool = False) -> bool:
+        """Перемещение файла или директории (rename в пределах одной файловой системы)"""
+        try:
+            safe_src, safe_dst = self._validate_move(src_path, dst_path)
+            
+            with self._lock_paths(write_paths=[safe_src, safe_dst]):
+                self._move_locked(safe_src, safe_dst, src_path, dst_path, overwrite)
+                
+                # Логирование
+                if self.db_operations:
+                    user = self.db_operations.get_current_user()
+                    self.db_operations.log_operation(
+                        OperationType.MODIFY, 
+                        user.id, 
+                        details=f"Перемещение: {src_path} -> {dst_path}"
+                    )
+                
+                return True
+        
+        except Exception as e:
+            raise e
+    
+    def _validate_move(self, src_path: str, dst_path: str) -> tuple:
+        """Валидация пары путей для перемещения"""
+        safe_src = self.validator.validate_path(src_path)
+        safe_dst = self.validator.validate_path(dst_path)
+        
+        if safe_src == safe_dst:
+            raise ValueError("Источник и назначение совпадают")
+        
+        if safe_dst.is_relative_to(safe_src):
+            raise ValueError("Нельзя переместить директорию внутрь самой себя")
+        
+        return safe_src, safe_dst
+    
+    def _move_locked(self, safe_src: Path, safe_dst: Path, src_path: str, dst_path: str, overwrite: bool):
+        """Перемещение под уже захваченными блокировками обоих путей"""
+        if not safe_src.exists():
+            raise FileNotFoundError(f"Файл {src_path} не существует")
+        
+        if safe_dst.exists() and not overwrite:
+            raise FileExistsError(f"{dst_path} уже существует")
+        
+        safe_dst.parent.mkdir(parents=True, exist_ok=True)
+        
+        # Квоты: при смене владельца объем переносится, при перезаписи освобождается
+        moved_size = overwritten_size = 0
+        same_owner = True
+        if self.quota_manager:
+            moved_size = self._path_size(safe_src)
+            overwritten_size = self._path_size(safe_dst)
+            same_owner = self.quota_manager.owner_of(safe_src) == self.quota_manager.owner_of(safe_dst)
+        
+        reserve = -overwritten_size if same_owner else moved_size - overwritten_size
+        with self._quota_reservation(safe_dst, reserve):
+            self._replace_path(safe_src, safe_dst)
+        
+        if not same_owner:
+            self.quota_manager.charge(safe_src, -moved_size)
+        
+        self._invalidate_cache(safe_src, safe_dst)
+    
+    def _replace_path(self, safe_src: Path, safe_dst: Path):
+        """rename, а между файловыми системами - копирование с удалением"""
+        try:
+            os.replace(safe_src, safe_dst)
+        except OSError as e:
+            if e.errno != errno.EXDEV:
+                raise
+            
+            # Разные файловые системы: копирование с последующим удалением
+            if safe_src.is_file():
+                with self._temp_file(safe_dst) as temp_path:
+                    self._copy_file_data(safe_src, temp_path)
+                    temp_path.replace(safe_dst)
+                safe_src.unlink()
+            else:
+                if safe_dst.exists():
+                    shutil.rmtree(safe_dst)
+                self._copy_tree(safe_src, safe_dst)
+                shutil.rmtree(safe_src)
+    
+    def write_many(self, items, durability: str = None) -> list:
+        """Пакетная запись файлов: items - словарь путь -> содержимое или пары (путь, содержимое).
+        
+        Содержимое - str (записывается в UTF-8) или bytes-подобный объект.
+        
+        Возвращает результат по каждому элементу вместо исключения на первой ошибке.
+        """
+        durability = self._check_durability(durability)
+        pairs = list(items.items()) if isinstance(items, dict) else list(items)
+        
+        def write(safe_path, user_path, content):
+            data = content.encode('utf-8') if isinstance(content, str) else content
+            existed = self._write_locked(safe_path, data, durability)
+            op_type = OperationType.MODIFY if existed else OperationType.CREATE
+            return op_type, f"Запись в файл: {user_path}"
+        
+        operations = []
+        for user_path, content in pairs:
+            operations.append((user_path, lambda safe_path, user_path=user_path, content=content:
+                               write(safe_path, user_path, content)))
+        
+        return self._run_bulk(operations)
+    
+    def delete_many(self, user_paths: list) -> list:
+        """Пакетное удаление файлов и директорий с результатом по каждому пути"""
+        def delete(safe_path, user_path):
+            self._delete_locked(safe_path, user_path)
+            return OperationType.DELETE, f"Удаление: {user_path}"
+        
+        operations = [(user_path, lambda safe_path, user_path=user_path: delete(safe_path, user_path))
+                      for user_path in user_paths]
+        return self._run_bulk(operations)
+    
+    def move_many(self, pairs, overwrite: bool = False) -> list:
+        """Пакетное перемещение: pairs - словарь или пары (откуда, куда)"""
+        pairs = list(pairs.items()) if isinstance(pairs, dict) else list(pairs)
+        results = [None] * len(pairs)
+        validated = []
+        
+        # Валидация всех путей до захвата блокировок
+        for index, (src_path, dst_path) in enumerate(pairs):
+            try:
+                safe_src, safe_dst = self._validate_move(src_path, dst_path)
+                validated.append((index, src_path, dst_path, safe_src, safe_dst))
+            except Exception as e:
+                results[index] = self._bulk_result(src_path, error=e, dst=dst_path)
+        
+        # Перемещения, затрагивающие пересекающиеся поддеревья (источник или
+        # назначение), выполняются последовательно в исходном порядке
+        groups = self._overlap_groups([item[3:] for item in validated])
+        
+        def move(item):
+            index, src_path, dst_path, safe_src, safe_dst = item
+            try:
+                self._move_locked(safe_src, safe_dst, src_path, dst_path, overwrite)
+                results[index] = self._bulk_result(src_path, dst=dst_path)
+                return OperationType.MODIFY, f"Перемещение: {src_path} -> {dst_path}"
+            except Exception as e:
+                results[index] = self._bulk_result(src_path, error=e, dst=dst_path)
+                return None
+        
+        def move_group(group):
+            return [move(validated[position]) for position in group]
+        
+        log_entries = []
+        all_paths = [path for item in validated for path in item[3:]]
+        with self._lock_paths(write_paths=all_paths):
+            with ThreadPoolExecutor(Config.BULK_MAX_WORKERS) as pool:
+                for entries in pool.map(move_group, groups):
+                    log_entries.extend(entries)
+        
+        self._log_batch([entry for entry in log_entries if entry])
+        return results
+    
+    def _run_bulk(self, operations: list) -> list:
+        """Выполнение пакета операций над отдельными путями.
+        
+        operations - пары (путь пользователя, функция(safe_path) -> (тип операции, описание)).
+        Все пути валидируются заранее, блокировки берутся один раз в порядке номеров,
+        операции над одним путем или вложенными друг в друга путями выполняются
+        последовательно в исходном порядке, параллельно - только над непересекающимися
+        поддеревьями; аудит пишется одной транзакцией.
+        """
+        results = [None] * len(operations)
+        validated = []  # (index, user_path, func, safe_path)
+        
+        for index, (user_path, func) in enumerate(operations):
+            try:
+                safe_path = self.validator.validate_path(user_path)
+                validated.append((index, user_path, func, safe_path))
+            except Exception as e:
+                results[index] = self._bulk_result(user_path, error=e)
+        
+        groups = self._overlap_groups([(item[3],) for item in validated])
+        
+        def run_group(group):
+            entries = []
+            for position in group:
+                index, user_path, func, safe_path = validated[position]
+                try:
+                    entries.append(func(safe_path))
+                    results[index] = self._bulk_result(user_path)
+                except Exception as e:
+                    results[index] = self._bulk_result(user_path, error=e)
+            return entries
+        
+        log_entries = []
+        with self._lock_paths(write_paths=[item[3] for item in validated]):
+            with ThreadPoolExecutor(Config.BULK_MAX_WORKERS) as pool:
+                for entries in pool.map(run_group, groups):
+                    log_entries.extend(entries)
+        
+        self._log_batch(log_entries)
+        return results
+    
+    @staticmethod
+    def _overlap_groups(item_paths: list) -> list:
+        """Разбиение элементов пакета на группы с пересекающимися путями.
+        
+        item_paths[i] - пути i-го элемента. Элементы связаны, если какой-либо путь
+        одного совпадает с путем другого или является его предком; связанность
+        транзитивна. Возвращает списки номеров элементов в исходном порядке.
+        """
+        parent = list(range(len(item_paths)))
+        
+        def find(i):
+            while parent[i] != i:
+                parent[i] = parent[parent[i]]
+                i = parent[i]
+            return i
+        
+        owners = {}  # путь -> номер первого элемента с этим путем
+        for i, paths in enumerate(item_paths):
+            for path in paths:
+                owners.setdefault(path, i)
+        
+        # Предок находится по цепочке родителей потомка, так что проверка
+        # в одну сторону покрывает обе
+        for i, paths in enumerate(item_paths):
+            for path in paths:
+                for ancestor in (path, *path.parents):
+                    j = owners.get(ancestor)
+                    if j is not None:
+                        parent[find(i)] = find(j)
+        
+        groups = {}
+        for i in range(len(item_paths)):
+            groups.setdefault(find(i), []).append(i)
+        return list(groups.values())
+    
+    def _bulk_result(self, user_path: str, error: Exception = None, dst: str = None) -> dict:
+        """Результат одного элемента пакетной операции"""
+        result = {
+            'path': user_path,
+            'success': error is None,
+            'error': f"{type(error).__name__}: {error}" if error else None
+        }
+        if dst is not None:
+            result['dst'] = dst
+        return result
+    
+    def _log_batch(self, entries: list):
+        """Запись журнала аудита пакетом: entries - пары (тип операции, описание)"""
+        if not self.db_operations or not entries:
+            return
+        
+        user = self.db_operations.get_current_user()
+        if hasattr(self.db_operations, 'log_operations_batch'):
+            self.db_operations.log_operations_batch(
+                [(op_type, user.id, None, None, details) for op_type, details in entries]
+            )
+        else:
+            for op_type, details in entries:
+                self.db_operations.log_operation(op_type, user.id, details=details)
+    
+    def _copy_tree(self, src_dir: Path, dst_dir: Path):
+        """Рекурсивное копирование директории (символические ссылки пропускаются)"""
+        dst_dir.mkdir()
+        
+        with os.scandir(src_dir) as entries:
+            for entry in entries:
+                # Ссылки могут указывать за пределы базового каталога
+                if entry.is_symlink():
+                    continue
+                
+                target = dst_dir / entry.name
+                if entry.is_dir(follow_symlinks=False):
+                    self._copy_tree(Path(entry.path), target)
+                elif entry.is_file(follow_symlinks=False):
+                    self._copy_file_data(Path(entry.path), target)
+        
+        shutil.copymode(src_dir, dst_dir)
+    
+    def _copy_file_data(self, src: Path, dst: Path):
+        """Копирование содержимого файла средствами ядра с запасным вариантом"""
+        with open(src, 'rb') as fsrc, open(dst, 'wb') as fdst:
+            src_stat = os.fstat(fsrc.fileno())
+            self._copy_fd(fsrc, fdst, src_stat.st_size)
+        
+        os.chmod(dst, stat.S_IMODE(src_stat.st_mode))
+    
+    def _copy_fd(self, fsrc, fdst, size: int):
+        """Копирование size байтов: copy_file_range -> sendfile -> чтение порциями"""
+        src_fd, dst_fd = fsrc.fileno(), fdst.fileno()
+        offset = 0
+        
+        if hasattr(os, 'copy_file_range'):
+            try:
+                while offset < size:
+                    copied = os.copy_file_range(src_fd, dst_fd, min(size - offset, COPY_CHUNK_SIZE), offset, offset)
+                    if copied == 0:
+                        return
+                    offset += copied
+                return
+            except OSError as e:
+                if e.errno not in _COPY_FALLBACK_ERRNOS:
+                    raise
+        
+        if hasattr(os, 'sendfile'):
+            try:
+                os.lseek(dst_fd, offset, os.SEEK_SET)
+                while offset < size:
+                    sent = os.sendfile(dst_fd, src_fd, offset, min(size - offset, COPY_CHUNK_SIZE))
+                    if sent == 0:
+                        return
+                    offset += sent
+                return
+            except OSError as e:
+                if e.errno not in _COPY_FALLBACK_ERRNOS:
+                    raise
+        
+        # Переносимый вариант: чтение в один переиспользуемый буфер
+        fsrc.seek(offset)
+        fdst.seek(offset)
+        buffer = bytearray(1024 * 1024)
+        view = memoryview(buffer)
+        while True:
+            read = fsrc.readinto(buffer)
+            if not read:
+                break
+            fdst.write(view[:read])
+    
+    def disk_usage(self, user_path: str = "", max_depth: int = None) -> list:
+        """Отчет о месте, занимаемом поддеревьями (аналог du), с параллельным обходом"""
+        try:
+            safe_path = self._resolve_directory(user_path)
+            base_dir = Config.BASE_DIR.resolve()
+            
+            report = []
+            for path, totals in self.tree_walker.disk_usage(safe_path).items():
+                depth = len(path.parts) - len(safe_path.parts)
+                if max_depth is not None and depth > max_depth:
+                    continue
+                report.append({
+                    'path': str(path.relative_to(base_dir)),
+                    'size': totals['size'],
+                    'file_count': totals['file_count'],
+                    'newest_mtime': totals['newest_mtime']
+                })
+            
+            # Логирование операции
+            if self.db_operations:
+                user = self.db_operations.get_current_user()
+                self.db_operations.log_operation(
+                    OperationType.READ, 
+                    user.id, 
+                    details=f"Подсчет занимаемого места: {user_path}"
+                )
+            
+            return sorted(report, key=lambda item: item['path'])
+        
+        except Exception as e:
+            raise e
+    
+    def get_disk_info(self) -> list:
+        """Получение информации о дисках (точные значения в байтах и inode)"""
+        return self.disk_info.get_disk_info()
+    
+    def get_base_dir_disk_info(self) -> dict:
+        """Информация о файловой системе, на которой расположен Config.BASE_DIR"""
+        return self.disk_info.info_for_path(Config.BASE_DIR)
 
     def get_current_directory(self) -> Path:
         """Получение текущей рабочей директории"""
@@ -212,11 +1097,7 @@ class FileManager:
                 # Обычный путь
                 safe_path = self.validator.validate_path(new_path)
         
-            if not safe_path.exists():
-                raise FileNotFoundError(f"Директория {new_path} не существует")
-        
-            if not safe_path.is_dir():
-                raise NotADirectoryError(f"{new_path} не является директорией")
+            self._check_directory(safe_path, new_path)
         
             # Обновляем базовый каталог валидатора
             self.validator.base_dir = safe_path
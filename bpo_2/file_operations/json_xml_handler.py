@@ -1,8 +1,172 @@
-﻿import json
+﻿import codecs
+import json
+import re
 import defusedxml.ElementTree as ET
 from defusedxml.common import DefusedXmlException
+from config import Config
 from file_operations.file_manager import FileManager
 
+# Хвост буфера, которым может продолжаться число в следующей порции
+_NUMBER_TAIL = re.compile(r'[0-9.eE+\-]*\Z')
+_WHITESPACE = re.compile(r'[ \t\r\n]*')
+# Ошибки разбора ближе к концу буфера могут означать лишь обрыв порции (tru|e, \u12|34)
+_TRUNCATION_MARGIN = 16
+
+
+class _TextStream:
+    """Текст файла, декодируемый из порций bytes, с позициями для сообщений об ошибках.
+    
+    В памяти держится только неразобранный остаток (не больше max_record символов).
+    """
+    
+    def __init__(self, chunks, max_record: int):
+        self._chunks = iter(chunks)
+        self._decoder = codecs.getincrementaldecoder('utf-8')()
+        self._max_record = max_record
+        self._bytes_read = 0
+        self._started = False
+        self.text = ""
+        self.pos = 0
+        self.eof = False
+        # Позиция text[0] в файле
+        self._base_byte = 0
+        self._base_line = 1
+        self._base_column = 0
+    
+    def fill(self, min_chars: int = 1) -> bool:
+        """Отбрасывание разобранного начала и дочитывание не менее min_chars символов
+        (или до конца файла); False, если файл уже исчерпан"""
+        if self.eof:
+            return False
+        
+        self._compact()
+        
+        # Порции склеиваются с буфером один раз, а не по одной
+        pieces = []
+        added = 0
+        while added < min_chars and not self.eof:
+            if len(self.text) + added > self._max_record:
+                raise ValueError(f"Запись превышает {self._max_record} символов ({self.describe(0)})")
+            
+            chunk = next(self._chunks, None)
+            pending = len(self._decoder.getstate()[0])
+            try:
+                if chunk is None:
+                    self.eof = True
+                    data = self._decoder.decode(b'', final=True)
+                else:
+                    data = self._decoder.decode(chunk)
+                    self._bytes_read += len(chunk)
+            except UnicodeDecodeError as e:
+                raise ValueError(f"Некорректная кодировка UTF-8 (байт {self._bytes_read - pending + e.start})")
+            
+            if not self._started and data:
+                self._started = True
+                if data.startswith('\ufeff'):
+                    data = data[1:]
+                    self._base_byte = len(codecs.BOM_UTF8)
+            
+            pieces.append(data)
+            added += len(data)
+        
+        self.text += ''.join(pieces)
+        return True
+    
+    def _compact(self):
+        if not self.pos:
+            return
+        
+        dropped = self.text[:self.pos]
+        self._base_byte += len(dropped.encode('utf-8'))
+        newlines = dropped.count('\n')
+        if newlines:
+            self._base_line += newlines
+            self._base_column = len(dropped) - dropped.rfind('\n') - 1
+        else:
+            self._base_column += len(dropped)
+        
+        self.text = self.text[self.pos:]
+        self.pos = 0
+    
+    def describe(self, index: int) -> str:
+        """Позиция символа text[index] в файле: строка, столбец (с 1) и смещение в байтах"""
+        prefix = self.text[:index]
+        newlines = prefix.count('\n')
+        if newlines:
+            column = index - prefix.rfind('\n')
+        else:
+            column = self._base_column + index + 1
+        byte = self._base_byte + len(prefix.encode('utf-8'))
+        return f"строка {self._base_line + newlines}, столбец {column}, байт {byte}"
+    
+    def skip_whitespace(self):
+        """Пропуск пробельных символов; возвращает следующий символ или None в конце файла"""
+        while True:
+            self.pos = _WHITESPACE.match(self.text, self.pos).end()
+            if self.pos < len(self.text):
+                return self.text[self.pos]
+            if not self.fill():
+                return None
+    
+    def decode_value(self, decoder: json.JSONDecoder):
+        """Разбор JSON значения с текущей позиции с дочитыванием порций"""
+        while True:
+            try:
+                value, end = decoder.raw_decode(self.text, self.pos)
+                # Число на границе порции может продолжаться в следующей
+                if self.eof or not _NUMBER_TAIL.match(self.text, end):
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError as e:
+                truncated = (e.pos >= len(self.text) - _TRUNCATION_MARGIN
+                             or e.msg.startswith("Unterminated string"))
+                if self.eof or not truncated:
+                    raise ValueError(f"Некорректный JSON формат ({self.describe(e.pos)}): {e.msg}")
+            
+            # Неразобранный остаток удваивается, чтобы повторные разборы крупной
+            # записи в сумме стоили O(размера записи), а не O(размер^2 / порция)
+            remaining = len(self.text) - self.pos
+            self.fill(max(1, min(remaining, self._max_record - remaining)))
+    
+    def next_line(self):
+        """Очередная строка (без перевода строки) и ее индекс в text, либо None в конце файла"""
+        scanned = 0
+        while True:
+            newline = self.text.find('\n', self.pos + scanned)
+            if newline != -1:
+                start, self.pos = self.pos, newline + 1
+                return self.text[start:newline], start
+            
+            scanned = len(self.text) - self.pos
+            if not self.fill():
+                if self.pos < len(self.text):
+                    start, self.pos = self.pos, len(self.text)
+                    return self.text[start:], start
+                return None
+
+
+class _ChunkReader:
+    """Файловый объект для iterparse поверх генератора порций bytes (без склейки порций)"""
+    
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self._chunk = b''
+        self._pos = 0
+    
+    def read(self, size: int = -1) -> bytes:
+        if size is None or size < 0:
+            data = self._chunk[self._pos:] + b''.join(self._chunks)
+            self._chunk, self._pos = b'', 0
+            return data
+        
+        if self._pos >= len(self._chunk):
+            self._chunk, self._pos = next(self._chunks, b''), 0
+        
+        data = self._chunk[self._pos:self._pos + size]
+        self._pos += len(data)
+        return data
+
+
 class JSONXMLHandler:
     def __init__(self, file_manager: FileManager):
         self.file_manager = file_manager
@@ -17,6 +181,78 @@ class JSONXMLHandler:
         except json.JSONDecodeError as e:
             raise ValueError(f"Некорректный JSON формат: {e}")
     
+    def iter_json(self, file_path: str, fmt: str = "auto", chunk_size: int = None):
+        """Потоковое чтение JSON: по одному элементу массива верхнего уровня или записи JSON Lines.
+        
+        fmt: "array", "lines" или "auto" (массив, если файл начинается с '[').
+        Файл читается порциями, поэтому память ограничена размером одной записи
+        (Config.JSON_MAX_RECORD_SIZE), а не файла. Ошибки содержат строку, столбец и байт.
+        """
+        if fmt not in ("auto", "array", "lines"):
+            raise ValueError(f"Неизвестный формат потокового JSON: {fmt}")
+        
+        chunks = self.file_manager.iter_chunks(file_path, chunk_size)
+        try:
+            stream = _TextStream(chunks, Config.JSON_MAX_RECORD_SIZE)
+            first = stream.skip_whitespace()
+            if first is None:
+                return
+            
+            if fmt == "auto":
+                fmt = "array" if first == '[' else "lines"
+            
+            if fmt == "array":
+                yield from self._iter_json_array(stream)
+            else:
+                yield from self._iter_json_lines(stream)
+        finally:
+            # Закрытие файла, если обход прерван
+            chunks.close()
+    
+    def _iter_json_array(self, stream: _TextStream):
+        decoder = json.JSONDecoder()
+        
+        if stream.skip_whitespace() != '[':
+            raise ValueError(f"Ожидался массив JSON ({stream.describe(stream.pos)})")
+        stream.pos += 1
+        
+        if stream.skip_whitespace() == ']':
+            stream.pos += 1
+        else:
+            while True:
+                if stream.skip_whitespace() is None:
+                    raise ValueError(f"Неожиданный конец файла ({stream.describe(stream.pos)})")
+                
+                yield stream.decode_value(decoder)
+                
+                delimiter = stream.skip_whitespace()
+                if delimiter is None:
+                    raise ValueError(f"Неожиданный конец файла ({stream.describe(stream.pos)})")
+                stream.pos += 1
+                if delimiter == ']':
+                    break
+                if delimiter != ',':
+                    raise ValueError(f"Ожидалась ',' или ']' ({stream.describe(stream.pos - 1)})")
+        
+        if stream.skip_whitespace() is not None:
+            raise ValueError(f"Лишние данные после массива JSON ({stream.describe(stream.pos)})")
+    
+    def _iter_json_lines(self, stream: _TextStream):
+        while True:
+            item = stream.next_line()
+            if item is None:
+                return
+            
+            line, start = item
+            if not line.strip():
+                continue
+            
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"Некорректный JSON формат ({stream.describe(start + e.pos)}): {e.msg}")
+            yield record
+    
     def write_json(self, file_path: str, data: dict) -> bool:
         """Безопасная запись JSON файла"""
         try:
@@ -44,6 +280,51 @@ class JSONXMLHandler:
         except ET.ParseError as e:
             raise ValueError(f"Некорректный XML формат: {e}")
     
+    def iter_xml(self, file_path: str, tag: str, chunk_size: int = None):
+        """Потоковое чтение XML через defusedxml.iterparse: по одной записи на каждый элемент tag.
+        
+        Запись - словарь как в read_xml (или текст, если у элемента нет дочерних).
+        Обработанные элементы очищаются и удаляются из дерева, поэтому память
+        не зависит от размера файла. Защита от XXE та же, что в read_xml.
+        """
+        chunks = self.file_manager.iter_chunks(file_path, chunk_size)
+        stack = []
+        open_matches = 0
+        
+        try:
+            for event, element in ET.iterparse(_ChunkReader(chunks), events=('start', 'end')):
+                matched = self._tag_matches(element.tag, tag)
+                
+                if event == 'start':
+                    stack.append(element)
+                    open_matches += matched
+                    continue
+                
+                stack.pop()
+                open_matches -= matched
+                if open_matches:
+                    # Внутри найденной записи - элемент понадобится целиком
+                    continue
+                
+                if matched:
+                    yield self._xml_to_dict(element) if len(element) else element.text
+                
+                element.clear()
+                if stack:
+                    stack[-1].remove(element)
+        
+        except DefusedXmlException as e:
+            raise ValueError(f"Обнаружена потенциально опасная XML конструкция: {e}")
+        except ET.ParseError as e:
+            raise ValueError(f"Некорректный XML формат: {e}")
+        finally:
+            # Закрытие файла, если обход прерван
+            chunks.close()
+    
+    def _tag_matches(self, element_tag: str, tag: str) -> bool:
+        """Совпадение тега с учетом пространства имен ("item" совпадает и с "{ns}item")"""
+        return element_tag == tag or element_tag.endswith('}' + tag)
+    
     def write_xml(self, file_path: str, data: dict, root_tag: str = "root") -> bool:
         """Безопасная запись XML файла"""
         try:
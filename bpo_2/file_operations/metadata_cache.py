@@ -0,0 +1,318 @@
+﻿import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from config import Config
+
+
+class InotifyWatcher:
+    """Наблюдение за директориями через inotify (Linux, ctypes, без зависимостей).
+    
+    Для каждой директории, в которой что-то изменилось, в фоновом потоке
+    вызывается callback(directory: Path, mask: int).
+    """
+    
+    IN_MODIFY = 0x00000002
+    IN_ATTRIB = 0x00000004
+    IN_CLOSE_WRITE = 0x00000008
+    IN_MOVED_FROM = 0x00000040
+    IN_MOVED_TO = 0x00000080
+    IN_CREATE = 0x00000100
+    IN_DELETE = 0x00000200
+    IN_DELETE_SELF = 0x00000400
+    IN_MOVE_SELF = 0x00000800
+    IN_Q_OVERFLOW = 0x00004000
+    IN_IGNORED = 0x00008000
+    IN_ONLYDIR = 0x01000000
+    
+    WATCH_MASK = (IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO |
+                  IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR)
+    
+    _IN_NONBLOCK = 0o4000
+    _IN_CLOEXEC = 0o2000000
+    _EVENT_HEADER = struct.Struct('iIII')
+    
+    def __init__(self, callback):
+        self._libc = self._load_libc()
+        if self._libc is None:
+            raise OSError("inotify недоступен на этой платформе")
+        
+        self._fd = self._libc.inotify_init1(self._IN_NONBLOCK | self._IN_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "Не удалось инициализировать inotify")
+        
+        self._callback = callback
+        self._lock = threading.Lock()
+        self._paths = {}  # wd -> путь
+        self._wds = {}    # путь -> wd
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="inotify-watcher", daemon=True)
+        self._thread.start()
+    
+    @staticmethod
+    def _load_libc():
+        if not sys.platform.startswith('linux'):
+            return None
+        try:
+            libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+            libc.inotify_init1.argtypes = [ctypes.c_int]
+            libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+            libc.inotify_rm_watch.argtypes = [ctypes.c_int, ctypes.c_int]
+            return libc
+        except (OSError, AttributeError):
+            return None
+    
+    @classmethod
+    def is_available(cls) -> bool:
+        """Поддерживается ли inotify на текущей платформе"""
+        return cls._load_libc() is not None
+    
+    def add_watch(self, directory: Path) -> bool:
+        """Начать наблюдение за директорией; False, если это невозможно"""
+        with self._lock:
+            if directory in self._wds:
+                return True
+            
+            wd = self._libc.inotify_add_watch(self._fd, os.fsencode(directory), self.WATCH_MASK)
+            if wd < 0:
+                return False
+            
+            self._paths[wd] = directory
+            self._wds[directory] = wd
+            return True
+    
+    def remove_watch(self, directory: Path):
+        """Прекратить наблюдение за директорией"""
+        with self._lock:
+            wd = self._wds.pop(directory, None)
+            if wd is not None:
+                self._paths.pop(wd, None)
+                self._libc.inotify_rm_watch(self._fd, wd)
+    
+    def is_watched(self, directory: Path) -> bool:
+        with self._lock:
+            return directory in self._wds
+    
+    def close(self):
+        """Остановка потока и освобождение дескриптора"""
+        self._stop.set()
+        self._thread.join()
+        os.close(self._fd)
+    
+    def _run(self):
+        while not self._stop.is_set():
+            ready, _, _ = select.select([self._fd], [], [], 0.5)
+            if not ready:
+                continue
+            
+            try:
+                buffer = os.read(self._fd, 64 * 1024)
+            except BlockingIOError:
+                continue
+            
+            self._dispatch(buffer)
+    
+    def _dispatch(self, buffer: bytes):
+        offset = 0
+        while offset < len(buffer):
+            wd, mask, _cookie, name_len = self._EVENT_HEADER.unpack_from(buffer, offset)
+            offset += self._EVENT_HEADER.size + name_len
+            
+            if mask & self.IN_Q_OVERFLOW:
+                # События потеряны - сбрасывается все
+                self._callback(None, mask)
+                continue
+            
+            with self._lock:
+                directory = self._paths.get(wd)
+                if mask & self.IN_IGNORED and directory is not None:
+                    self._paths.pop(wd, None)
+                    self._wds.pop(directory, None)
+            
+            if directory is not None:
+                self._callback(directory, mask)
+
+
+# Директории, измененные менее чем за это окно до чтения, не кешируются по mtime:
+# грубая гранулярность времени ФС может скрыть изменение в ту же единицу времени
+_RACY_WINDOW_NS = 2 * 10**9
+
+
+class DirectoryMetadataCache:
+    """LRU-кеш листингов директорий под Config.BASE_DIR.
+    
+    Актуальность записи подтверждается inotify (без системных вызовов), а где
+    inotify недоступен - сравнением mtime директории (один stat). Проверка mtime
+    замечает только добавление, удаление и переименование элементов, поэтому
+    FileManager сам сбрасывает записи при записи и удалении файлов.
+    
+    Ни один из способов не замечает изменения внутри поддиректорий: mtime
+    вложенной директории в кешированном листинге родителя может устареть, если
+    ее содержимое менялось в обход FileManager (свои изменения FileManager
+    сбрасывает вместе со всеми предками).
+    """
+    
+    def __init__(self, max_entries: int = None, use_inotify: bool = True):
+        self.max_entries = max_entries or Config.METADATA_CACHE_SIZE
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # путь -> {'mtime_ns': ..., 'items': [...]}
+        self._generation = 0           # счетчик сбросов (защита от гонок с загрузкой)
+        self.hits = 0
+        self.misses = 0
+        
+        self._watcher = None
+        if use_inotify and InotifyWatcher.is_available():
+            try:
+                self._watcher = InotifyWatcher(self._on_change)
+            except OSError:
+                self._watcher = None
+    
+    @property
+    def uses_inotify(self) -> bool:
+        return self._watcher is not None
+    
+    def get_listing(self, directory: Path, loader) -> list:
+        """Листинг директории из кеша или через loader() при промахе.
+        
+        Возвращаемый список разделяется между вызовами и не должен изменяться.
+        """
+        with self._lock:
+            entry = self._entries.get(directory)
+        
+        if entry is not None and self._is_fresh(directory, entry):
+            with self._lock:
+                self.hits += 1
+                if directory in self._entries:
+                    self._entries.move_to_end(directory)
+            return entry['items']
+        
+        with self._lock:
+            self.misses += 1
+            generation = self._generation
+        
+        # Наблюдение ставится до чтения, чтобы не пропустить изменения во время обхода
+        watched = self._watcher is not None and self._watcher.add_watch(directory)
+        stored = False
+        try:
+            mtime_ns = None if watched else os.stat(directory).st_mtime_ns
+            items = loader()
+            
+            if mtime_ns is not None and time.time_ns() - mtime_ns < _RACY_WINDOW_NS:
+                return items
+            
+            with self._lock:
+                # Если во время загрузки что-то сбрасывалось, результат может быть устаревшим
+                if self._generation == generation:
+                    self._entries[directory] = {'mtime_ns': mtime_ns, 'items': items}
+                    self._entries.move_to_end(directory)
+                    self._evict()
+                    stored = True
+            
+            return items
+        finally:
+            if watched and not stored:
+                # Наблюдение без записи в кеше не нужно; запись, сохраненная другим
+                # потоком без наблюдения, просто будет считаться устаревшей
+                with self._lock:
+                    if directory not in self._entries:
+                        self._watcher.remove_watch(directory)
+    
+    def is_dir(self, path: Path):
+        """True/False по данным кеша или None, если ответ неизвестен"""
+        with self._lock:
+            entry = self._entries.get(path)
+            parent = self._entries.get(path.parent)
+        
+        # Собственный листинг подтверждает директорию, только если он актуален
+        # (в режиме mtime запись удаленной извне директории остается в кеше)
+        if entry is not None and self._is_fresh(path, entry):
+            return True
+        
+        if parent is None or not self._is_fresh(path.parent, parent):
+            return None
+        
+        for item in parent['items']:
+            if item['name'] == path.name:
+                return item['is_dir']
+        return None
+    
+    def invalidate(self, path: Path):
+        """Сброс записей, которые могли устареть после изменения path.
+        
+        Сбрасываются сам путь, все его потомки и все предки до Config.BASE_DIR
+        (у предков меняется mtime вложенной директории в листинге).
+        """
+        base_dir = Config.BASE_DIR.resolve()
+        with self._lock:
+            for cached in list(self._entries):
+                if cached == path or cached.is_relative_to(path):
+                    self._drop(cached)
+            
+            ancestor = path.parent
+            while ancestor.is_relative_to(base_dir):
+                self._drop(ancestor)
+                if ancestor == base_dir:
+                    break
+                ancestor = ancestor.parent
+    
+    def clear(self):
+        with self._lock:
+            for cached in list(self._entries):
+                self._drop(cached)
+    
+    def hit_ratio(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+    
+    def stats(self) -> dict:
+        """Статистика кеша"""
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': self.hit_ratio(),
+                'inotify': self.uses_inotify
+            }
+    
+    def close(self):
+        if self._watcher is not None:
+            self._watcher.close()
+            self._watcher = None
+    
+    def _is_fresh(self, directory: Path, entry: dict) -> bool:
+        if entry['mtime_ns'] is None:
+            # Запись подтверждается inotify: пока наблюдение активно, событий не было
+            return self._watcher is not None and self._watcher.is_watched(directory)
+        try:
+            return os.stat(directory).st_mtime_ns == entry['mtime_ns']
+        except OSError:
+            return False
+    
+    def _on_change(self, directory, mask):
+        if directory is None:
+            self.clear()
+        elif mask & (InotifyWatcher.IN_DELETE_SELF | InotifyWatcher.IN_MOVE_SELF):
+            self.invalidate(directory)
+        else:
+            with self._lock:
+                self._drop(directory)
+    
+    def _drop(self, directory: Path):
+        """Удаление записи (вызывается под self._lock)"""
+        self._generation += 1
+        if self._entries.pop(directory, None) is not None and self._watcher is not None:
+            self._watcher.remove_watch(directory)
+    
+    def _evict(self):
+        """Вытеснение самых старых записей (вызывается под self._lock)"""
+        while len(self._entries) > self.max_entries:
+            directory, _ = self._entries.popitem(last=False)
+            if self._watcher is not None:
+                self._watcher.remove_watch(directory)
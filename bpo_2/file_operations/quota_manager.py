@@ -0,0 +1,250 @@
+﻿import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from config import Config
+from file_operations.tree_walker import ParallelTreeWalker
+
+
+class QuotaExceededError(Exception):
+    """Исключение при превышении квоты пользователя"""
+    pass
+
+
+class QuotaManager:
+    """Квоты на реальное хранилище Config.BASE_DIR с инкрементальным учетом.
+    
+    Владелец определяется по пути: BASE_DIR/<QUOTA_HOME_DIR>/<имя>/... принадлежит
+    пользователю <имя>, все остальное - Config.QUOTA_DEFAULT_OWNER. Счетчики
+    хранятся в памяти: проверка и учет при записи - O(1) без обращения к БД.
+    Измененные счетчики сохраняются пакетом (flush) фоновым заданием, при сверке
+    и в close(); изменения, не сохраненные из-за сбоя, исправит следующая сверка,
+    которая пересчитывает счетчики параллельным обходом дерева.
+    """
+    
+    def __init__(self, db_path: str = None, tree_walker: ParallelTreeWalker = None):
+        self.db_path = db_path or Config.DB_PATH
+        self.tree_walker = tree_walker or ParallelTreeWalker()
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()  # Порядок сохранений в БД
+        self._walk_lock = threading.Lock()   # Одна сверка за раз
+        self._pending = None  # Изменения, учтенные во время обхода сверки
+        self._dirty = set()  # Владельцы с несохраненными счетчиками
+        self._usage = {}   # владелец -> занято байт
+        self._limits = {}  # владелец -> лимит в байтах (None - без ограничения)
+        self._reconcile_thread = None
+        self._reconcile_stop = threading.Event()
+        self.init_database()
+        self._load()
+    
+    def init_database(self):
+        """Создание таблицы квот"""
+        with self.transaction() as cursor:
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS storage_quotas (
+                    owner VARCHAR(50) PRIMARY KEY,
+                    limit_bytes INTEGER,
+                    used_bytes INTEGER DEFAULT 0,
+                    reconciled_at TIMESTAMP
+                )
+            ''')
+    
+    @contextmanager
+    def transaction(self):
+        """Контекстный менеджер для транзакций"""
+        conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        cursor = conn.cursor()
+        
+        try:
+            yield cursor
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            raise e
+        finally:
+            conn.close()
+    
+    def _load(self):
+        with self.transaction() as cursor:
+            cursor.execute("SELECT owner, limit_bytes, used_bytes FROM storage_quotas")
+            for row in cursor.fetchall():
+                self._usage[row['owner']] = row['used_bytes'] or 0
+                self._limits[row['owner']] = row['limit_bytes']
+    
+    def owner_of(self, safe_path: Path) -> str:
+        """Владелец пути внутри базового каталога"""
+        base_dir = Config.BASE_DIR.resolve()
+        try:
+            parts = Path(safe_path).relative_to(base_dir).parts
+        except ValueError:
+            return Config.QUOTA_DEFAULT_OWNER
+        
+        if len(parts) >= 2 and parts[0] == Config.QUOTA_HOME_DIR:
+            return parts[1]
+        return Config.QUOTA_DEFAULT_OWNER
+    
+    def set_limit(self, owner: str, limit_bytes):
+        """Установка лимита владельца (None - без ограничения)"""
+        with self._lock:
+            self._limits[owner] = limit_bytes
+            self._usage.setdefault(owner, 0)
+            with self.transaction() as cursor:
+                cursor.execute('''
+                    INSERT INTO storage_quotas (owner, limit_bytes, used_bytes) VALUES (?, ?, ?)
+                    ON CONFLICT(owner) DO UPDATE SET limit_bytes = excluded.limit_bytes
+                ''', (owner, limit_bytes, self._usage[owner]))
+    
+    def get_usage(self, owner: str) -> dict:
+        """Использование и лимит владельца"""
+        with self._lock:
+            used = self._usage.get(owner, 0)
+            limit = self._limits.get(owner, Config.QUOTA_DEFAULT_LIMIT)
+        return {
+            'owner': owner,
+            'used_bytes': used,
+            'limit_bytes': limit,
+            'available_bytes': None if limit is None else max(0, limit - used)
+        }
+    
+    def reserve(self, safe_path: Path, delta: int):
+        """Проверка и учет изменения объема под одной блокировкой (O(1)).
+        
+        Если запись затем не удалась, резерв отменяется через release().
+        """
+        owner = self.owner_of(safe_path)
+        with self._lock:
+            used = self._usage.get(owner, 0)
+            limit = self._limits.get(owner, Config.QUOTA_DEFAULT_LIMIT)
+            if delta > 0 and limit is not None and used + delta > limit:
+                raise QuotaExceededError(
+                    f"Превышена квота пользователя {owner}: занято {used}, лимит {limit}, требуется {delta}"
+                )
+            self._apply(owner, delta)
+    
+    def release(self, safe_path: Path, delta: int):
+        """Отмена ранее сделанного резерва"""
+        self.charge(safe_path, -delta)
+    
+    def charge(self, safe_path: Path, delta: int):
+        """Учет изменения объема без проверки лимита (удаление, отмена резерва)"""
+        if delta == 0:
+            return
+        owner = self.owner_of(safe_path)
+        with self._lock:
+            self._apply(owner, delta)
+    
+    def _apply(self, owner: str, delta: int):
+        """Изменение счетчика в памяти (вызывается под self._lock)"""
+        if delta == 0:
+            return
+        self._usage[owner] = max(0, self._usage.get(owner, 0) + delta)
+        self._dirty.add(owner)
+        if self._pending is not None:
+            self._pending[owner] = self._pending.get(owner, 0) + delta
+    
+    def _snapshot(self, owners) -> list:
+        """Строки (владелец, лимит, занято) для сохранения (вызывается под self._lock)"""
+        return [(owner, self._limits.get(owner, Config.QUOTA_DEFAULT_LIMIT), self._usage.get(owner, 0))
+                for owner in owners]
+    
+    def flush(self):
+        """Сохранение измененных счетчиков в БД одной транзакцией.
+        
+        Транзакция выполняется вне блокировки учета, поэтому запись файлов
+        не ждет БД. При ошибке счетчики остаются помеченными для следующей попытки.
+        """
+        with self._flush_lock:
+            with self._lock:
+                if not self._dirty:
+                    return
+                rows = self._snapshot(self._dirty)
+                self._dirty.clear()
+            
+            try:
+                with self.transaction() as cursor:
+                    cursor.executemany('''
+                        INSERT INTO storage_quotas (owner, limit_bytes, used_bytes) VALUES (?, ?, ?)
+                        ON CONFLICT(owner) DO UPDATE SET used_bytes = excluded.used_bytes
+                    ''', rows)
+            except Exception:
+                with self._lock:
+                    self._dirty.update(owner for owner, _, _ in rows)
+                raise
+    
+    def reconcile(self) -> dict:
+        """Пересчет счетчиков параллельным обходом BASE_DIR; возвращает новые значения.
+        
+        Резервы и списания, сделанные во время обхода, собираются в журнал и
+        прибавляются к результату обхода, а не теряются. Файл, который обход
+        уже увидел, может быть учтен дважды - расхождение исправит следующая сверка.
+        """
+        base_dir = Config.BASE_DIR.resolve()
+        with self._walk_lock:
+            with self._lock:
+                self._pending = {}
+            totals = {}
+            try:
+                for record in self.tree_walker.walk(base_dir):
+                    owner = self.owner_of(record['path'])
+                    totals[owner] = totals.get(owner, 0) + record['size']
+            except Exception as e:
+                with self._lock:
+                    self._pending = None
+                raise e
+            
+            reconciled_at = time.time()
+            with self._flush_lock:
+                with self._lock:
+                    pending, self._pending = self._pending, None
+                    for owner in set(self._usage) | set(totals) | set(pending):
+                        self._usage[owner] = max(0, totals.get(owner, 0) + pending.get(owner, 0))
+                    rows = self._snapshot(self._usage)
+                    self._dirty.clear()
+                
+                with self.transaction() as cursor:
+                    cursor.executemany('''
+                        INSERT INTO storage_quotas (owner, limit_bytes, used_bytes, reconciled_at) VALUES (?, ?, ?, ?)
+                        ON CONFLICT(owner) DO UPDATE SET used_bytes = excluded.used_bytes,
+                                                         reconciled_at = excluded.reconciled_at
+                    ''', [row + (reconciled_at,) for row in rows])
+        
+        return {owner: used for owner, _, used in rows}
+    
+    def start_reconcile_job(self, interval: float = None, flush_interval: float = None):
+        """Запуск фонового задания: сохранение счетчиков раз в flush_interval и сверка раз в interval"""
+        if self._reconcile_thread is not None:
+            return
+        
+        interval = interval or Config.QUOTA_RECONCILE_INTERVAL
+        flush_interval = min(flush_interval or Config.QUOTA_FLUSH_INTERVAL, interval)
+        self._reconcile_stop.clear()
+        
+        def run():
+            next_reconcile = time.monotonic() + interval
+            while not self._reconcile_stop.wait(flush_interval):
+                try:
+                    if time.monotonic() >= next_reconcile:
+                        next_reconcile = time.monotonic() + interval
+                        self.reconcile()
+                    else:
+                        self.flush()
+                except Exception as e:
+                    print(f"Ошибка сверки квот: {e}")
+        
+        self._reconcile_thread = threading.Thread(target=run, name="quota-reconcile", daemon=True)
+        self._reconcile_thread.start()
+    
+    def stop_reconcile_job(self):
+        """Остановка фонового задания"""
+        if self._reconcile_thread is None:
+            return
+        self._reconcile_stop.set()
+        self._reconcile_thread.join()
+        self._reconcile_thread = None
+    
+    def close(self):
+        """Остановка фонового задания и сохранение несохраненных счетчиков"""
+        self.stop_reconcile_job()
+        self.flush()
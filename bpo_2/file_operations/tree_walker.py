@@ -0,0 +1,187 @@
+﻿import os
+import queue
+import threading
+from collections import deque
+from pathlib import Path
+from config import Config
+
+_DONE = object()
+
+
+class ParallelTreeWalker:
+    """Параллельный обход дерева директорий на os.scandir.
+    
+    Каждый поток берет директории из своей очереди с конца (обход в глубину,
+    хорошая локальность), а когда она пуста - крадет из начала чужих очередей.
+    scandir и stat отпускают GIL, поэтому потоки действительно работают
+    параллельно на системных вызовах.
+    
+    Результаты отдаются потоково, по одной записи на директорию:
+        {'path': Path, 'file_count': int, 'dir_count': int, 'size': int,
+         'newest_mtime': float, 'files': [(Path, os.stat_result), ...], 'error': str | None}
+    size, file_count и newest_mtime относятся только к файлам самой директории.
+    Символические ссылки не разыменовываются.
+    """
+    
+    def __init__(self, max_workers: int = None, queue_size: int = 1024):
+        self.max_workers = max_workers or Config.WALKER_MAX_WORKERS
+        self.queue_size = queue_size
+    
+    def walk(self, root: Path, collect_files: bool = False):
+        """Генератор записей о директориях поддерева root"""
+        root = Path(root)
+        workers = self.max_workers
+        deques = [deque() for _ in range(workers)]
+        deque_locks = [threading.Lock() for _ in range(workers)]
+        state = {'pending': 1, 'finished': 0, 'exception': None}
+        state_lock = threading.Condition()
+        results = queue.Queue(self.queue_size)
+        stop = threading.Event()    # Аварийная остановка обхода
+        closed = threading.Event()  # Потребитель прекратил чтение
+        
+        deques[0].append(root)
+        
+        def take(index):
+            # Своя очередь - с конца, чужие - с начала
+            with deque_locks[index]:
+                if deques[index]:
+                    return deques[index].pop()
+            for offset in range(1, workers):
+                victim = (index + offset) % workers
+                with deque_locks[victim]:
+                    if deques[victim]:
+                        return deques[victim].popleft()
+            return None
+        
+        def put_result(item) -> bool:
+            while not closed.is_set():
+                try:
+                    results.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+        
+        def worker(index):
+            try:
+                while not stop.is_set() and not closed.is_set():
+                    directory = take(index)
+                    if directory is None:
+                        with state_lock:
+                            if state['pending'] == 0:
+                                return
+                            state_lock.wait(0.05)
+                        continue
+                    
+                    record, subdirs = self._scan(directory, collect_files)
+                    
+                    if subdirs:
+                        with deque_locks[index]:
+                            deques[index].extend(subdirs)
+                    
+                    with state_lock:
+                        state['pending'] += len(subdirs) - 1
+                        state_lock.notify_all()
+                    
+                    if not put_result(record):
+                        return
+            except BaseException as e:
+                with state_lock:
+                    state['exception'] = state['exception'] or e
+                stop.set()
+            finally:
+                with state_lock:
+                    state['finished'] += 1
+                    if state['finished'] == workers:
+                        put_result(_DONE)
+        
+        threads = [threading.Thread(target=worker, args=(i,), name=f"tree-walker-{i}", daemon=True)
+                   for i in range(workers)]
+        for t in threads:
+            t.start()
+        
+        try:
+            while True:
+                item = results.get()
+                if item is _DONE:
+                    break
+                yield item
+            
+            if state['exception'] is not None:
+                raise state['exception']
+        finally:
+            # Потребитель мог прекратить чтение досрочно
+            closed.set()
+            with state_lock:
+                state_lock.notify_all()
+            for t in threads:
+                t.join()
+    
+    def iter_files(self, root: Path):
+        """Генератор (путь, stat) для всех обычных файлов поддерева"""
+        for record in self.walk(root, collect_files=True):
+            yield from record['files']
+    
+    def disk_usage(self, root: Path) -> dict:
+        """Суммарные размеры поддеревьев (аналог du).
+        
+        Возвращает словарь путь -> {'size', 'file_count', 'newest_mtime'}
+        с итогами по каждому поддереву, включая сам root.
+        """
+        root = Path(root)
+        totals = {}
+        for record in self.walk(root):
+            totals[record['path']] = {
+                'size': record['size'],
+                'file_count': record['file_count'],
+                'newest_mtime': record['newest_mtime']
+            }
+        
+        # Сложение снизу вверх: сначала самые глубокие директории
+        for path in sorted(totals, key=lambda p: len(p.parts), reverse=True):
+            if path == root:
+                continue
+            parent = totals.get(path.parent)
+            if parent is None:
+                continue
+            child = totals[path]
+            parent['size'] += child['size']
+            parent['file_count'] += child['file_count']
+            parent['newest_mtime'] = max(parent['newest_mtime'], child['newest_mtime'])
+        
+        return totals
+    
+    def _scan(self, directory: Path, collect_files: bool):
+        record = {
+            'path': directory,
+            'file_count': 0,
+            'dir_count': 0,
+            'size': 0,
+            'newest_mtime': 0.0,
+            'files': [],
+            'error': None
+        }
+        subdirs = []
+        
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            subdirs.append(Path(entry.path))
+                            record['dir_count'] += 1
+                        elif entry.is_file(follow_symlinks=False):
+                            entry_stat = entry.stat(follow_symlinks=False)
+                            record['file_count'] += 1
+                            record['size'] += entry_stat.st_size
+                            if entry_stat.st_mtime > record['newest_mtime']:
+                                record['newest_mtime'] = entry_stat.st_mtime
+                            if collect_files:
+                                record['files'].append((Path(entry.path), entry_stat))
+                    except FileNotFoundError:
+                        # Элемент удален во время обхода
+                        continue
+        except OSError as e:
+            record['error'] = str(e)
+        
+        return record, subdirs
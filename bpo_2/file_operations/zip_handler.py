@@ -1,61 +1,568 @@
-﻿import zipfile
+﻿import fnmatch
+import json
+import re
+import zipfile
 import os
+import time
+import uuid
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 from file_operations.file_manager import FileManager
 from security.path_validator import PathValidator, PathTraversalError
+from file_operations.zip_raw import (MANIFEST_NAME, SPLITTABLE_METHODS, RawMemberWriter, compress_segments,
+                                     copy_member, raw_write_supported)
+from file_operations.compression_policy import CompressionPolicy
+from file_operations.zip_index import ZipIndex, read_central_directory
 from config import Config
 
+MANIFEST_VERSION = 1
+
+_MAX_SEGMENTS_PER_TASK = 256  # Предел числа мелких файлов в одной задаче сжатия
+_STREAM_BUFFER_SIZE = 1024 * 1024  # Буфер копирования потокового архиватора
+
 class ZipBombError(Exception):
     """Исключение для ZIP-бомб"""
     pass
 
+def _archive_budget(archive_size: int) -> int:
+    """Предел фактически распакованных байтов для всего архива размером archive_size.
+    
+    Отношение проверяется для архива целиком, а не по членам: отдельный член
+    обычных данных может сжиматься в тысячи и миллионы раз.
+    """
+    ratio_limit = max(Config.ZIP_RATIO_MIN_SIZE, archive_size * Config.ZIP_MAX_RATIO)
+    return min(Config.MAX_ZIP_SIZE, ratio_limit)
+
+
+def _inflate_chunks(zipf: zipfile.ZipFile, file_info: zipfile.ZipInfo, budget: int, chunk_size: int = None):
+    """Потоковая распаковка члена архива с подсчетом фактически распакованных байтов.
+    
+    Заявленным в центральном каталоге размерам не доверяем: поток прерывается
+    ZipBombError, как только распакованный объем превысит ZIP_MAX_MEMBER_SIZE
+    или оставшийся бюджет budget (см. _archive_budget). Лишняя работа при
+    срабатывании ограничена одним фрагментом.
+    """
+    chunk_size = chunk_size or _STREAM_BUFFER_SIZE
+    member_limit = min(Config.ZIP_MAX_MEMBER_SIZE, budget)
+    inflated = 0
+    
+    with zipf.open(file_info, 'r') as source:
+        while True:
+            chunk = source.read(chunk_size)
+            if not chunk:
+                break
+            
+            inflated += len(chunk)
+            if inflated > member_limit:
+                raise ZipBombError(f"Превышен максимальный размер распакованных данных: {file_info.filename}")
+            
+            yield chunk
+
+
+def _inflate_member(zipf: zipfile.ZipFile, file_info: zipfile.ZipInfo, target_path, budget: int) -> int:
+    """Распаковка члена архива в файл target_path; возвращает число записанных байтов"""
+    written = 0
+    with open(target_path, 'wb') as target:
+        for chunk in _inflate_chunks(zipf, file_info, budget):
+            target.write(chunk)
+            written += len(chunk)
+    return written
+
+
+def _staging_path(target_path: Path) -> Path:
+    """Уникальное временное имя рядом с target_path для распаковки до фиксации"""
+    return target_path.with_name(f".{target_path.name}.{uuid.uuid4().hex}.tmp")
+
+
+def _extract_members(zip_path: str, members: list, budget: int):
+    """Распаковка набора членов архива (выполняется в процессе пула).
+    
+    members - список (смещение локального заголовка члена, временный путь):
+    смещение, в отличие от имени, однозначно и при повторяющихся именах. budget - предел
+    фактически распакованных байтов для всего набора. Возвращает исключение или
+    None: ошибка не выбрасывается, чтобы остальные наборы тоже завершились до отката.
+    """
+    try:
+        with zipfile.ZipFile(zip_path, 'r') as zipf:
+            infos = {info.header_offset: info for info in zipf.infolist()}
+            for header_offset, staging_path in members:
+                budget -= _inflate_member(zipf, infos[header_offset], staging_path, budget)
+    except Exception as e:
+        return e
+    return None
+
+class _DetachableSink:
+    """Обертка приемника stream_zip, после detach() отбрасывающая запись и перемещения.
+    
+    Позволяет закрыть ZipFile после ошибки обычным close(), не дописав в
+    приемник центральный каталог. tell/seek передаются приемнику, пока он есть
+    у него, чтобы zipfile так же определял, поддерживается ли seek.
+    """
+    
+    def __init__(self, sink):
+        self._sink = sink
+        self._detached = False
+        self._position = 0
+    
+    def detach(self):
+        try:
+            self._position = self._sink.tell()
+        except (AttributeError, OSError, ValueError):
+            pass
+        self._detached = True
+    
+    def write(self, data) -> int:
+        if self._detached:
+            return len(data)
+        return self._sink.write(data)
+    
+    def flush(self):
+        if not self._detached:
+            self._sink.flush()
+    
+    def tell(self) -> int:
+        if self._detached:
+            return self._position
+        return self._sink.tell()
+    
+    def seek(self, offset: int, whence: int = 0) -> int:
+        if self._detached:
+            return self._position
+        return self._sink.seek(offset, whence)
+
+
 class ZipHandler:
-    def __init__(self, file_manager: FileManager, path_validator: PathValidator):
+    def __init__(self, file_manager: FileManager, path_validator: PathValidator, zip_index: ZipIndex = None):
         self.file_manager = file_manager
         self.validator = path_validator
+        self.zip_index = zip_index  # Необязательный постоянный индекс содержимого архивов
     
-    def create_zip(self, source_paths: list, zip_path: str) -> bool:
-        """Создание ZIP архива с проверками безопасности"""
+    def create_zip(self, source_paths: list, zip_path: str, parallel: bool = False, max_workers: int = None,
+                   incremental: bool = False, policy: CompressionPolicy = None) -> bool:
+        """Создание ZIP архива с проверками безопасности.
+        
+        При parallel=True члены архива сжимаются в пуле процессов (см. _write_parallel);
+        архив получается тем же по составу и порядку, что и при последовательном сжатии.
+        
+        При incremental=True в архив пишется манифест MANIFEST_NAME с (размер,
+        mtime_ns, CRC) каждого файла. Если предыдущий архив с манифестом уже есть,
+        сжатые данные неизмененных файлов переносятся из него без повторного сжатия,
+        заново сжимаются только новые и измененные файлы (они идут после
+        перенесенных), удаленные файлы в новый архив не попадают.
+        
+        Архив собирается во временном файле и заменяет старый только после
+        успешной записи; при включенных квотах перед заменой резервируется
+        разница размеров нового и старого архива.
+        
+        policy - адаптивный выбор метода сжатия для каждого файла (см.
+        CompressionPolicy); без нее все файлы сжимаются DEFLATE с уровнем по умолчанию.
+        """
         try:
             safe_zip_path = self.validator.validate_path(zip_path)           
             # Проверка расширения файла
             if safe_zip_path.suffix.lower() != '.zip':
                 raise ValueError("Целевой файл должен иметь расширение .zip")
             
-            total_size = 0
-            files_to_zip = []
+            files_to_zip = self._collect_files(source_paths, safe_zip_path)
+            
+            previous = self._read_manifest(safe_zip_path) if incremental else {}
+            target_path = safe_zip_path.with_name(f".{safe_zip_path.name}.{uuid.uuid4().hex}.tmp")
+            
+            # Создание ZIP архива
+            try:
+                with zipfile.ZipFile(target_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
+                    # Перенос и параллельная запись готовых сжатых данных опираются на
+                    # внутренности zipfile; без их поддержки - обычная последовательная запись
+                    raw_write = raw_write_supported(zipf)
+                    
+                    changed_files = files_to_zip
+                    if previous and raw_write:
+                        changed_files = self._copy_unchanged(zipf, safe_zip_path, files_to_zip, previous)
+                    
+                    methods = self._choose_methods(changed_files, policy)
+                    if parallel and raw_write:
+                        self._write_parallel(zipf, changed_files, methods, max_workers or Config.ZIP_MAX_WORKERS)
+                    else:
+                        for (file_path, _), (method, level) in zip(changed_files, methods):
+                            # Сохранение относительных путей
+                            arcname = file_path.relative_to(Config.BASE_DIR)
+                            zipf.write(file_path, arcname, method, level)
+                    
+                    if incremental:
+                        self._write_manifest(zipf, files_to_zip)
+                
+                self._replace_charged(target_path, safe_zip_path)
+            except BaseException:
+                # Недописанный архив не оставляем
+                target_path.unlink(missing_ok=True)
+                raise
+            return True        
+        except Exception as e:
+            raise e
+    
+    def _replace_charged(self, temp_path: Path, safe_path: Path):
+        """Замена safe_path готовым файлом temp_path с учетом разницы размеров в квоте"""
+        quota_manager = self.file_manager.quota_manager
+        delta = 0
+        if quota_manager:
+            delta = temp_path.stat().st_size - (safe_path.stat().st_size if safe_path.is_file() else 0)
+            quota_manager.reserve(safe_path, delta)
+        
+        try:
+            os.replace(temp_path, safe_path)
+        except BaseException:
+            if quota_manager:
+                quota_manager.release(safe_path, delta)
+            raise
+    
+    @staticmethod
+    def _choose_methods(files_to_zip: list, policy: CompressionPolicy) -> list:
+        """Метод и уровень сжатия для каждого файла: (метод zipfile, уровень или None)"""
+        if policy is None:
+            return [(zipfile.ZIP_DEFLATED, None)] * len(files_to_zip)
+        return [policy.choose(file_path, file_stat.st_size) for file_path, file_stat in files_to_zip]
+    
+    @staticmethod
+    def _read_manifest(safe_zip_path: Path) -> dict:
+        """Манифест предыдущего архива: имя -> [размер, mtime_ns, CRC]; {} если его нет или он поврежден"""
+        if not safe_zip_path.is_file():
+            return {}
+        
+        try:
+            with zipfile.ZipFile(safe_zip_path, 'r') as zipf:
+                if MANIFEST_NAME not in zipf.NameToInfo:
+                    return {}
+                manifest = json.loads(zipf.read(MANIFEST_NAME))
+            
+            if manifest.get('version') != MANIFEST_VERSION:
+                return {}
+            return manifest['files']
+        
+        except (zipfile.BadZipFile, OSError, ValueError, KeyError, AttributeError):
+            # Поврежденный манифест - полная пересборка
+            return {}
+    
+    @staticmethod
+    def _copy_unchanged(zipf: zipfile.ZipFile, old_zip_path: Path, files_to_zip: list, previous: dict) -> list:
+        """Перенос неизмененных членов из старого архива; возвращает файлы, требующие сжатия"""
+        changed_files = []
+        
+        with zipfile.ZipFile(old_zip_path, 'r') as old_zipf, open(old_zip_path, 'rb') as raw:
+            for file_path, file_stat in files_to_zip:
+                arcname = file_path.relative_to(Config.BASE_DIR).as_posix()
+                entry = previous.get(arcname)
+                old_info = old_zipf.NameToInfo.get(arcname)
+                
+                if (entry is not None and old_info is not None
+                        and entry == [file_stat.st_size, file_stat.st_mtime_ns, old_info.CRC]
+                        and old_info.file_size == file_stat.st_size):
+                    copy_member(raw, old_info, zipf)
+                else:
+                    changed_files.append((file_path, file_stat))
+        
+        return changed_files
+    
+    @staticmethod
+    def _write_manifest(zipf: zipfile.ZipFile, files_to_zip: list):
+        """Запись манифеста (размер, mtime_ns, CRC) всех файлов архива последним членом"""
+        files = {}
+        for file_path, file_stat in files_to_zip:
+            arcname = file_path.relative_to(Config.BASE_DIR).as_posix()
+            files[arcname] = [file_stat.st_size, file_stat.st_mtime_ns, zipf.getinfo(arcname).CRC]
+        
+        manifest = {'version': MANIFEST_VERSION, 'files': files}
+        zipf.writestr(MANIFEST_NAME, json.dumps(manifest, ensure_ascii=False, sort_keys=True))
+    
+    def _collect_files(self, source_paths: list, safe_zip_path: Path) -> list:
+        """Сбор файлов для архивации: отсортированный список (путь, stat) в пределах MAX_ZIP_SIZE"""
+        total_size = 0
+        files_to_zip = []
+        
+        # Сбор информации о файлах для архивации (параллельный обход директорий)
+        for source_path in source_paths:
+            safe_source_path = self.validator.validate_path(source_path)
+            
+            if safe_source_path.is_file():
+                files = [(safe_source_path, safe_source_path.stat())]
+            elif safe_source_path.is_dir():
+                files = self.file_manager.tree_walker.iter_files(safe_source_path)
+            else:
+                files = []
             
-            # Сбор информации о файлах для архивации
-            for source_path in source_paths:
-                safe_source_path = self.validator.validate_path(source_path)
+            for file, file_stat in files:
+                # Сам создаваемый архив в него не попадает
+                if file == safe_zip_path:
+                    continue
                 
-                if safe_source_path.is_file():
-                    file_size = safe_source_path.stat().st_size
-                    total_size += file_size
-                    files_to_zip.append(safe_source_path)
-                elif safe_source_path.is_dir():
-                    for file in safe_source_path.rglob('*'):
-                        if file.is_file():
-                            file_size = file.stat().st_size
-                            total_size += file_size
-                            files_to_zip.append(file)
+                total_size += file_stat.st_size
+                files_to_zip.append((file, file_stat))
                 
                 # Проверка общего размера
                 if total_size > Config.MAX_ZIP_SIZE:
                     raise ZipBombError("Общий размер файлов для архивации превышает лимит")
+        
+        # Порядок обхода недетерминирован, порядок в архиве - нет
+        files_to_zip.sort(key=lambda item: item[0])
+        return files_to_zip
+    
+    def _write_parallel(self, zipf: zipfile.ZipFile, files_to_zip: list, methods: list, max_workers: int):
+        """Сжатие членов архива в пуле процессов и запись их в исходном порядке.
+        
+        Файлы режутся на фрагменты по ZIP_CHUNK_SIZE, мелкие файлы группируются в
+        одну задачу. Задачи выполняются не более чем по две на процесс вперед,
+        так что в памяти одновременно находится ограниченный объем сжатых данных.
+        Каждый файл читается не дальше размера, учтенного при проверке лимита.
+        Члены BZIP2/LZMA крупнее ZIP_CHUNK_SIZE нельзя разрезать, поэтому они
+        сжимаются потоково в этом процессе, когда до них доходит очередь записи,
+        а пул тем временем обрабатывает следующие задачи.
+        """
+        tasks = self._plan_segments(files_to_zip, methods)
+        pending = deque()
+        writer = None
+        
+        try:
+            with ProcessPoolExecutor(max_workers=max_workers) as executor:
+                def submit_next():
+                    task = next(tasks, None)
+                    if isinstance(task, int):
+                        pending.append(task)
+                    elif task is not None:
+                        pending.append(executor.submit(compress_segments, task))
+                
+                for _ in range(max_workers * 2):
+                    submit_next()
+                
+                while pending:
+                    task = pending.popleft()
+                    submit_next()
+                    
+                    if isinstance(task, int):
+                        file_path, _ = files_to_zip[task]
+                        method, level = methods[task]
+                        zipf.write(file_path, file_path.relative_to(Config.BASE_DIR), method, level)
+                        continue
+                    
+                    results = task.result()
+                    for member, crc, length, compressed, last in results:
+                        if writer is None:
+                            file_path, _ = files_to_zip[member]
+                            zinfo = zipfile.ZipInfo.from_file(file_path, file_path.relative_to(Config.BASE_DIR))
+                            zinfo.compress_type = methods[member][0]
+                            writer = RawMemberWriter(zipf, zinfo)
+                        
+                        writer.write(compressed, crc, length)
+                        if last:
+                            writer.close()
+                            writer = None
+        except BaseException:
+            for future in pending:
+                if not isinstance(future, int):
+                    future.cancel()
+            # Освобождение архива, чтобы его можно было закрыть
+            if writer is not None:
+                writer.abort()
+            raise
+    
+    @staticmethod
+    def _plan_segments(files_to_zip: list, methods: list):
+        """Разбиение файлов на задачи сжатия: списки (номер, путь, смещение, длина, последний, метод, уровень).
+        
+        BZIP2 и LZMA не допускают склейки независимо сжатых фрагментов, поэтому
+        такие файлы до ZIP_CHUNK_SIZE сжимаются целиком одной задачей, а более
+        крупные выдаются номером члена для последовательного сжатия в родителе.
+        """
+        task = []
+        task_bytes = 0
+        
+        for member, ((file_path, file_stat), (method, level)) in enumerate(zip(files_to_zip, methods)):
+            size = file_stat.st_size
+            if method not in SPLITTABLE_METHODS and size > Config.ZIP_CHUNK_SIZE:
+                if task:
+                    yield task
+                    task = []
+                    task_bytes = 0
+                yield member
+                continue
             
-            # Создание ZIP архива
-            with zipfile.ZipFile(safe_zip_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
-                for file_path in files_to_zip:
-                    # Сохранение относительных путей
-                    arcname = file_path.relative_to(Config.BASE_DIR)
-                    zipf.write(file_path, arcname)
-            return True        
-        except Exception as e:
-            raise e
+            chunk_size = Config.ZIP_CHUNK_SIZE if method in SPLITTABLE_METHODS else max(size, 1)
+            offset = 0
+            while True:
+                length = min(chunk_size, size - offset)
+                last = offset + length >= size
+                task.append((member, str(file_path), offset, length, last, method, level))
+                task_bytes += length
+                offset += length
+                
+                if task_bytes >= Config.ZIP_CHUNK_SIZE or len(task) >= _MAX_SEGMENTS_PER_TASK:
+                    yield task
+                    task = []
+                    task_bytes = 0
+                
+                if last:
+                    break
+        
+        if task:
+            yield task
     
-    def extract_zip(self, zip_path: str, extract_path: str = "") -> bool:
-        """Извлечение ZIP архива с защитой от ZIP-бомб"""
+    def stream_zip(self, source_paths: list, sink) -> dict:
+        """Однопроходное создание ZIP архива в произвольный файловый объект (файл, канал, сокет).
+        
+        Источники обходятся через os.scandir, каждый файл записывается сразу после
+        обнаружения, а MAX_ZIP_SIZE проверяется перед каждым файлом - лимит не
+        превышается ни на байт. В памяти держится только стек непройденных
+        директорий и буфер копирования. Для приемников без seek zipfile пишет
+        дескрипторы данных. При ошибке центральный каталог не записывается, так
+        что получатель не примет оборванный поток за целый архив.
+        
+        Если приемник - файл внутри BASE_DIR и квоты включены, перед каждым
+        членом резервируется его несжатый размер, а по завершении учет
+        выравнивается по фактическому приросту файла.
+        """
+        safe_sources = [self.validator.validate_path(source_path) for source_path in source_paths]
+        
+        # Если приемник - файл внутри обходимого дерева, он не должен попасть в архив
+        try:
+            sink_stat = os.fstat(sink.fileno())
+            sink_id = (sink_stat.st_dev, sink_stat.st_ino)
+        except (AttributeError, OSError, ValueError):
+            sink_id = None
+        
+        quota_manager = self.file_manager.quota_manager
+        quota_path = self._sink_path(sink) if quota_manager and sink_id else None
+        reserved = 0
+        
+        total_size = 0
+        file_count = 0
+        buffer = bytearray(_STREAM_BUFFER_SIZE)
+        stream = _DetachableSink(sink)
+        zipf = zipfile.ZipFile(stream, 'w', zipfile.ZIP_DEFLATED)
+        
+        try:
+            for safe_source_path in safe_sources:
+                for file_path, file_stat in self._scan_files(safe_source_path):
+                    if sink_id == (file_stat.st_dev, file_stat.st_ino):
+                        continue
+                    
+                    # Проверка лимита до записи файла
+                    total_size += file_stat.st_size
+                    if total_size > Config.MAX_ZIP_SIZE:
+                        raise ZipBombError("Общий размер файлов для архивации превышает лимит")
+                    
+                    if quota_path:
+                        quota_manager.reserve(quota_path, file_stat.st_size)
+                        reserved += file_stat.st_size
+                    
+                    arcname = Path(file_path).relative_to(Config.BASE_DIR).as_posix()
+                    self._stream_member(zipf, file_path, arcname, file_stat, buffer)
+                    file_count += 1
+        except BaseException:
+            # Дальнейшая запись (в том числе центрального каталога при закрытии) в приемник не попадает
+            stream.detach()
+            raise
+        finally:
+            zipf.close()
+            if quota_path:
+                self._settle_sink_quota(sink, quota_path, sink_stat.st_size, reserved)
+        
+        return {
+            'file_count': file_count,
+            'total_size': total_size,
+        }
+    
+    @staticmethod
+    def _sink_path(sink):
+        """Путь файла-приемника, если он внутри BASE_DIR (для учета квоты), иначе None"""
+        name = getattr(sink, 'name', None)
+        if not isinstance(name, (str, bytes, os.PathLike)):
+            return None
+        path = Path(os.fsdecode(name)).resolve()
+        return path if path.is_relative_to(Config.BASE_DIR.resolve()) else None
+    
+    def _settle_sink_quota(self, sink, quota_path: Path, initial_size: int, reserved: int):
+        """Выравнивание резерва по фактическому приросту файла-приемника"""
+        try:
+            sink.flush()
+        except (AttributeError, OSError, ValueError):
+            pass
+        grown = os.fstat(sink.fileno()).st_size - initial_size
+        self.file_manager.quota_manager.charge(quota_path, grown - reserved)
+    
+    @staticmethod
+    def _scan_files(root: Path):
+        """Обход дерева через os.scandir: (путь, stat) файлов в детерминированном порядке.
+        
+        Символические ссылки не раскрываются, как и в ParallelTreeWalker.
+        """
+        if root.is_file():
+            yield str(root), root.stat()
+            return
+        if not root.is_dir():
+            return
+        
+        stack = [str(root)]
+        while stack:
+            directory = stack.pop()
+            try:
+                with os.scandir(directory) as it:
+                    entries = sorted(it, key=lambda entry: entry.name)
+            except OSError:
+                continue
+            
+            subdirs = []
+            for entry in entries:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        subdirs.append(entry.path)
+                    elif entry.is_file(follow_symlinks=False):
+                        yield entry.path, entry.stat(follow_symlinks=False)
+                except OSError:
+                    continue
+            
+            # Поддиректории обходятся в алфавитном порядке
+            stack.extend(reversed(subdirs))
+    
+    @staticmethod
+    def _stream_member(zipf: zipfile.ZipFile, file_path: str, arcname: str, file_stat, buffer: bytearray):
+        """Запись одного файла в архив не более чем на учтенные в лимите st_size байт"""
+        date_time = time.localtime(file_stat.st_mtime)[:6]
+        if date_time[0] < 1980:
+            date_time = (1980, 1, 1, 0, 0, 0)
+        
+        zinfo = zipfile.ZipInfo(arcname, date_time)
+        zinfo.external_attr = (file_stat.st_mode & 0xFFFF) << 16
+        zinfo.file_size = file_stat.st_size
+        zinfo.compress_type = zipfile.ZIP_DEFLATED
+        
+        view = memoryview(buffer)
+        remaining = file_stat.st_size
+        with open(file_path, 'rb') as src, zipf.open(zinfo, 'w') as dst:
+            while remaining > 0:
+                read = src.readinto(view[:min(remaining, len(view))])
+                if not read:
+                    break
+                dst.write(view[:read])
+                remaining -= read
+    
+    def extract_zip(self, zip_path: str, extract_path: str = "", members: list = None,
+                    pattern: str = None, regex: str = None, parallel: bool = False,
+                    max_workers: int = None) -> bool:
+        """Извлечение ZIP архива с защитой от ZIP-бомб.
+        
+        Если задан хотя бы один фильтр, извлекаются только подходящие члены:
+        members - точные имена, pattern - glob-шаблон (fnmatch), regex -
+        регулярное выражение (re.search); член выбирается, если подходит под любой
+        из фильтров. Проверки путей и лимит размера применяются к выбранным членам.
+        
+        Заявленные размеры проверяются до распаковки, а фактически распакованные
+        байты - по ходу потоковой распаковки (см. _inflate_chunks). Члены
+        распаковываются во временные файлы и переименовываются в целевые только
+        после успешной распаковки всех, поэтому при ошибке существующие файлы не
+        затрагиваются, а удаляются лишь временные файлы и созданные директории.
+        
+        При parallel=True все проверки и учет размера выполняются до распаковки,
+        после чего члены распаковываются в пуле процессов (см. _extract_parallel).
+        """
         try:
             safe_zip_path = self.validator.validate_path(zip_path)
             safe_extract_path = self.validator.validate_path(extract_path) if extract_path else Config.BASE_DIR
@@ -63,72 +570,275 @@ class ZipHandler:
             if not safe_zip_path.exists():
                 raise FileNotFoundError(f"ZIP архив {zip_path} не существует")
             
+            archive_budget = _archive_budget(safe_zip_path.stat().st_size)
             total_extracted_size = 0
-            extracted_files = []
+            inflated_size = 0  # Фактически распакованные байты
+            staged = []  # (временный путь, целевой путь) распакованных файлов
+            created_dirs = []  # Директории, созданные распаковкой
+            planned = []  # (член, путь) для параллельной распаковки
+            reserved = []  # (путь, байт) - резервы квот для отката
+            quota_manager = self.file_manager.quota_manager
             
             with zipfile.ZipFile(safe_zip_path, 'r') as zipf:
-                # Проверка каждого файла в архиве
-                for file_info in zipf.infolist():
+                # Проверка каждого выбранного файла в архиве
+                for file_info in self._select_members(zipf, members, pattern, regex):
                     # Проверка на Path Traversal в именах файлов
-                    try:
-                        target_path = (safe_extract_path / file_info.filename).resolve()
-                        if not target_path.is_relative_to(safe_extract_path):
-                            raise PathTraversalError(f"Опасное имя файла в архиве: {file_info.filename}")
-                    except:
-                        raise PathTraversalError(f"Опасное имя файла в архиве: {file_info.filename}")
+                    target_path = self._member_target(file_info, safe_extract_path)
                     
                     # Проверка размера распакованного файла
                     file_size = file_info.file_size
                     total_extracted_size += file_size
                     
-                    # Защита от ZIP-бомбы
-                    if total_extracted_size > Config.MAX_ZIP_SIZE:
-                        # Удаление уже распакованных файлов
-                        for extracted_file in extracted_files:
-                            if extracted_file.exists():
-                                extracted_file.unlink()
+                    # Защита от ZIP-бомбы (откат созданного - в обработчике ошибки)
+                    if total_extracted_size > archive_budget:
                         raise ZipBombError("Превышен максимальный размер распакованных данных")
                     
-                    # Извлечение файла
-                    zipf.extract(file_info, safe_extract_path)
-                    extracted_file_path = safe_extract_path / file_info.filename
-                    extracted_files.append(extracted_file_path)
+                    if not file_info.is_dir() and target_path.is_dir():
+                        raise IsADirectoryError(f"{target_path.relative_to(Config.BASE_DIR)} является директорией")
+                    
+                    # Учет квоты владельца целевого каталога: заменяемый файл освобождает свой объем
+                    if quota_manager and not file_info.is_dir():
+                        delta = file_size - (target_path.stat().st_size if target_path.is_file() else 0)
+                        quota_manager.reserve(target_path, delta)
+                        reserved.append((target_path, delta))
+                    
+                    if parallel:
+                        planned.append((file_info, target_path))
+                        continue
+                    
+                    if file_info.is_dir():
+                        self._make_dirs(target_path, created_dirs)
+                        continue
+                    
+                    # Извлечение во временный файл (в список до распаковки, чтобы удалить и недописанный)
+                    self._make_dirs(target_path.parent, created_dirs)
+                    staging_path = _staging_path(target_path)
+                    staged.append((staging_path, target_path))
+                    inflated_size += _inflate_member(zipf, file_info, staging_path,
+                                                     archive_budget - inflated_size)
+            
+            if parallel:
+                self._extract_parallel(safe_zip_path, planned, max_workers or Config.ZIP_MAX_WORKERS,
+                                       staged, created_dirs)
+            
+            # Фиксация: все члены распакованы, временные файлы заменяют целевые
+            # (уже переименованные при откате пропускаются - их нет на месте)
+            for staging_path, target_path in staged:
+                os.replace(staging_path, target_path)
             
             return True
         
         except Exception as e:
             # Очистка в случае ошибки
             try:
-                for extracted_file in extracted_files:
-                    if extracted_file.exists():
-                        extracted_file.unlink()
+                for staging_path, _ in staged:
+                    if staging_path.is_file():
+                        staging_path.unlink()
+                for directory in reversed(created_dirs):
+                    try:
+                        directory.rmdir()
+                    except OSError:
+                        pass
+                for path, size in reserved:
+                    quota_manager.release(path, size)
             except:
                 pass
             raise e
     
+    @staticmethod
+    def _extract_parallel(safe_zip_path: Path, planned: list, max_workers: int,
+                          staged: list, created_dirs: list):
+        """Распаковка проверенных членов в пуле процессов.
+        
+        Все нужные директории создаются заранее (созданные записываются в
+        created_dirs для отката). Файлы делятся на непересекающиеся наборы,
+        сбалансированные по сжатому размеру; каждый процесс сам открывает архив и
+        распаковывает свой набор во временные файлы. Пары (временный, целевой путь)
+        попадают в staged до запуска пула, чтобы вызывающий код мог удалить
+        временные файлы при ошибке или зафиксировать их при успехе.
+        """
+        directories = set()
+        files = []
+        for file_info, target_path in planned:
+            if file_info.is_dir():
+                directories.add(target_path)
+            else:
+                directories.add(target_path.parent)
+                # Временные имена - в порядке архива, чтобы фиксация шла в нем же
+                staging_path = _staging_path(target_path)
+                staged.append((staging_path, target_path))
+                files.append((file_info, staging_path))
+        
+        for directory in sorted(directories, key=lambda path: len(path.parts)):
+            ZipHandler._make_dirs(directory, created_dirs)
+        
+        if not files:
+            return
+        
+        # Жадное распределение: самый крупный член - в наименее загруженный набор
+        workers = max(1, min(max_workers, len(files)))
+        buckets = [[] for _ in range(workers)]
+        budgets = [0] * workers  # Заявленный объем набора - предел фактически распакованного
+        loads = [0] * workers
+        for file_info, staging_path in sorted(files, key=lambda item: item[0].compress_size, reverse=True):
+            index = loads.index(min(loads))
+            buckets[index].append((file_info.header_offset, str(staging_path)))
+            budgets[index] += file_info.file_size
+            loads[index] += file_info.compress_size + 1
+        
+        error = None
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(_extract_members, str(safe_zip_path), bucket, budget)
+                       for bucket, budget in zip(buckets, budgets)]
+            for future in futures:
+                worker_error = future.result()
+                if worker_error is not None and error is None:
+                    error = worker_error
+        
+        if error is not None:
+            raise error
+    
+    @staticmethod
+    def _make_dirs(directory: Path, created_dirs: list):
+        """Создание директории с недостающими родителями; созданные добавляются в created_dirs"""
+        missing = []
+        parent = directory
+        while not parent.exists():
+            missing.append(parent)
+            parent = parent.parent
+        for path in reversed(missing):
+            path.mkdir()
+            created_dirs.append(path)
+    
+    def iter_member(self, zip_path: str, member: str, chunk_size: int = 1024 * 1024):
+        """Потоковое чтение одного члена архива: генератор фрагментов bytes до chunk_size.
+        
+        Архив целиком не распаковывается; в памяти держится один фрагмент.
+        Имя члена проверяется так же, как при извлечении, объявленный размер -
+        на MAX_ZIP_SIZE, а фактически распакованный объем - теми же лимитами, что
+        и при распаковке (см. _inflate_chunks).
+        """
+        safe_zip_path = self.validator.validate_path(zip_path)
+        
+        if not safe_zip_path.exists():
+            raise FileNotFoundError(f"ZIP архив {zip_path} не существует")
+        
+        with zipfile.ZipFile(safe_zip_path, 'r') as zipf:
+            file_info = self._select_members(zipf, [member], None, None)[0]
+            self._member_target(file_info, Config.BASE_DIR)
+            
+            if file_info.is_dir():
+                raise IsADirectoryError(f"{member} является директорией")
+            
+            if file_info.file_size > Config.MAX_ZIP_SIZE:
+                raise ZipBombError("Превышен максимальный размер распакованных данных")
+            
+            yield from _inflate_chunks(zipf, file_info, _archive_budget(safe_zip_path.stat().st_size), chunk_size)
+    
+    @staticmethod
+    def _select_members(zipf: zipfile.ZipFile, members: list, pattern: str, regex: str) -> list:
+        """Члены архива, подходящие под любой из фильтров (все, если фильтры не заданы)"""
+        infos = [info for info in zipf.infolist() if info.filename != MANIFEST_NAME]
+        
+        if members is None and pattern is None and regex is None:
+            return infos
+        
+        names = set(members or ())
+        missing = names - {info.filename for info in infos}
+        if missing:
+            raise FileNotFoundError(f"В архиве нет файлов: {', '.join(sorted(missing))}")
+        
+        compiled = re.compile(regex) if regex is not None else None
+        return [
+            info for info in infos
+            if info.filename in names
+            or (pattern is not None and fnmatch.fnmatchcase(info.filename, pattern))
+            or (compiled is not None and compiled.search(info.filename))
+        ]
+    
+    @staticmethod
+    def _member_target(file_info: zipfile.ZipInfo, safe_extract_path: Path) -> Path:
+        """Путь извлечения члена архива с проверкой на Path Traversal"""
+        try:
+            target_path = (safe_extract_path / file_info.filename).resolve()
+            if not target_path.is_relative_to(safe_extract_path):
+                raise PathTraversalError(f"Опасное имя файла в архиве: {file_info.filename}")
+        except:
+            raise PathTraversalError(f"Опасное имя файла в архиве: {file_info.filename}")
+        return target_path
+    
     def get_zip_info(self, zip_path: str) -> dict:
         """Получение информации о ZIP архиве"""
         try:
-            safe_zip_path = self.validator.validate_path(zip_path)
+            safe_zip_path = self._existing_zip(zip_path)
             
-            if not safe_zip_path.exists():
-                raise FileNotFoundError(f"ZIP архив {zip_path} не существует")
+            if self.zip_index:
+                summary = self.zip_index.summary(safe_zip_path)
+                file_count = summary['file_count']
+                total_size = summary['total_size']
+                compressed_size = summary['size']
+            else:
+                compressed_size = safe_zip_path.stat().st_size
+                with zipfile.ZipFile(safe_zip_path, 'r') as zipf:
+                    total_size = 0
+                    file_count = 0
+                    
+                    for file_info in zipf.infolist():
+                        if file_info.filename == MANIFEST_NAME:
+                            continue
+                        total_size += file_info.file_size
+                        file_count += 1
             
-            with zipfile.ZipFile(safe_zip_path, 'r') as zipf:
-                total_size = 0
-                file_count = 0
-                
-                for file_info in zipf.infolist():
-                    total_size += file_info.file_size
-                    file_count += 1
-                
-                return {
-                    'filename': safe_zip_path.name,
-                    'file_count': file_count,
-                    'total_size': total_size,
-                    'compressed_size': safe_zip_path.stat().st_size,
-                    'compression_ratio': (1 - safe_zip_path.stat().st_size / total_size) * 100 if total_size > 0 else 0
-                }
+            return {
+                'filename': safe_zip_path.name,
+                'file_count': file_count,
+                'total_size': total_size,
+                'compressed_size': compressed_size,
+                'compression_ratio': (1 - compressed_size / total_size) * 100 if total_size > 0 else 0
+            }
         
         except Exception as e:
-            raise e
\ No newline at end of file
+            raise e
+    
+    def list_zip(self, zip_path: str, prefix: str = "", limit: int = None, offset: int = 0) -> list:
+        """Члены архива с именами, начинающимися с prefix, в порядке имен (через индекс, если он подключен)"""
+        safe_zip_path = self._existing_zip(zip_path)
+        
+        if self.zip_index:
+            return self.zip_index.list_members(safe_zip_path, prefix, limit, offset)
+        
+        members = [member for member in read_central_directory(safe_zip_path)
+                   if not member['synthetic'] and member['name'].startswith(prefix)]
+        return members[offset:] if limit is None else members[offset:offset + limit]
+    
+    def browse_zip(self, zip_path: str, directory: str = "") -> list:
+        """Непосредственное содержимое директории внутри архива"""
+        safe_zip_path = self._existing_zip(zip_path)
+        
+        if self.zip_index:
+            return self.zip_index.browse(safe_zip_path, directory)
+        
+        directory = directory.strip('/')
+        directory = directory + '/' if directory else ''
+        members = [member for member in read_central_directory(safe_zip_path) if member['parent'] == directory]
+        return sorted(members, key=lambda member: (not member['is_dir'], member['name']))
+    
+    def find_zip_member(self, zip_path: str, member: str):
+        """Сведения о члене архива по имени (None, если такого нет)"""
+        safe_zip_path = self._existing_zip(zip_path)
+        
+        if self.zip_index:
+            return self.zip_index.lookup(safe_zip_path, member)
+        
+        for row in read_central_directory(safe_zip_path):
+            if row['name'] == member:
+                return row
+        return None
+    
+    def _existing_zip(self, zip_path: str) -> Path:
+        safe_zip_path = self.validator.validate_path(zip_path)
+        
+        if not safe_zip_path.exists():
+            raise FileNotFoundError(f"ZIP архив {zip_path} не существует")
+        
+        return safe_zip_path
@@ -0,0 +1,237 @@
+﻿import sqlite3
+import threading
+import time
+import zipfile
+from contextlib import contextmanager
+from pathlib import Path
+from config import Config
+from file_operations.zip_raw import MANIFEST_NAME
+
+
+def read_central_directory(zip_path: Path) -> list:
+    """Записи центрального каталога архива в виде словарей, включая неявные директории.
+    
+    Для члена "a/b/c.txt" без собственных записей "a/" и "a/b/" добавляются
+    синтетические директории (synthetic = 1), чтобы по архиву можно было
+    перемещаться как по дереву. Служебный манифест пропускается.
+    """
+    members = {}
+    with zipfile.ZipFile(zip_path, 'r') as zipf:
+        for info in zipf.infolist():
+            if info.filename == MANIFEST_NAME:
+                continue
+            members[info.filename] = _member_row(info.filename, info.is_dir(), info.file_size, info.compress_size,
+                                                 info.CRC, '%04d-%02d-%02d %02d:%02d:%02d' % info.date_time,
+                                                 info.header_offset, False)
+    
+    for name in list(members):
+        parent = _parent_of(name)
+        while parent and parent not in members:
+            members[parent] = _member_row(parent, True, 0, 0, 0, None, None, True)
+            parent = _parent_of(parent)
+    
+    return sorted(members.values(), key=lambda row: row['name'])
+
+
+def _parent_of(name: str) -> str:
+    """Родительская директория члена архива ("a/b/" для "a/b/c.txt" и "a/b/c/", "" для верхнего уровня)"""
+    stripped = name.rstrip('/')
+    index = stripped.rfind('/')
+    return stripped[:index + 1] if index >= 0 else ''
+
+
+def _member_row(name, is_dir, file_size, compress_size, crc, date_time, header_offset, synthetic) -> dict:
+    return {
+        'name': name,
+        'parent': _parent_of(name),
+        'is_dir': bool(is_dir),
+        'file_size': file_size,
+        'compress_size': compress_size,
+        'crc': crc,
+        'date_time': date_time,
+        'header_offset': header_offset,
+        'synthetic': bool(synthetic),
+    }
+
+
+def _prefix_upper_bound(prefix: str) -> str:
+    """Наименьшая строка, большая всех строк с данным префиксом"""
+    return prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+class ZipIndex:
+    """Постоянный индекс содержимого ZIP архивов в SQLite.
+    
+    Архив идентифицируется путем, а актуальность записи проверяется по (size,
+    mtime_ns) одним stat на запрос: если архив изменился, его центральный каталог
+    перечитывается и индекс перестраивается автоматически. Листинг, просмотр по
+    префиксу и поиск члена выполняются запросами к индексу без разбора архива.
+    """
+    
+    def __init__(self, db_path: str = None):
+        self.db_path = db_path or Config.ZIP_INDEX_DB_PATH
+        self._lock = threading.Lock()  # Одна перестройка индекса за раз
+        self.init_database()
+    
+    def init_database(self):
+        """Создание таблиц индекса"""
+        with self.transaction() as cursor:
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS zip_archives (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    path TEXT UNIQUE NOT NULL,
+                    size INTEGER NOT NULL,
+                    mtime_ns INTEGER NOT NULL,
+                    file_count INTEGER NOT NULL,
+                    total_size INTEGER NOT NULL,
+                    indexed_at REAL NOT NULL
+                )
+            ''')
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS zip_members (
+                    archive_id INTEGER NOT NULL,
+                    name TEXT NOT NULL,
+                    parent TEXT NOT NULL,
+                    is_dir BOOLEAN NOT NULL,
+                    file_size INTEGER NOT NULL,
+                    compress_size INTEGER NOT NULL,
+                    crc INTEGER NOT NULL,
+                    date_time TEXT,
+                    header_offset INTEGER,
+                    synthetic BOOLEAN DEFAULT 0,
+                    PRIMARY KEY (archive_id, name)
+                ) WITHOUT ROWID
+            ''')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_zip_members_parent ON zip_members(archive_id, parent)')
+    
+    @contextmanager
+    def transaction(self):
+        """Контекстный менеджер для транзакций"""
+        conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        cursor = conn.cursor()
+        
+        try:
+            yield cursor
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            raise e
+        finally:
+            conn.close()
+    
+    def summary(self, zip_path: Path) -> dict:
+        """Сводка по архиву: размер файла, число членов и их общий распакованный размер"""
+        archive = self._archive(zip_path)
+        return {
+            'path': archive['path'],
+            'size': archive['size'],
+            'file_count': archive['file_count'],
+            'total_size': archive['total_size'],
+        }
+    
+    def list_members(self, zip_path: Path, prefix: str = "", limit: int = None, offset: int = 0) -> list:
+        """Члены архива в порядке имен, имя которых начинается с prefix (с постраничной выборкой)"""
+        archive = self._archive(zip_path)
+        query = "SELECT * FROM zip_members WHERE archive_id = ? AND synthetic = 0"
+        params = [archive['id']]
+        if prefix:
+            query += " AND name >= ? AND name < ?"
+            params += [prefix, _prefix_upper_bound(prefix)]
+        query += " ORDER BY name LIMIT ? OFFSET ?"
+        params += [-1 if limit is None else limit, offset]
+        
+        with self.transaction() as cursor:
+            cursor.execute(query, params)
+            return [self._row(row) for row in cursor.fetchall()]
+    
+    def browse(self, zip_path: Path, directory: str = "") -> list:
+        """Непосредственное содержимое директории архива: сначала директории, затем файлы"""
+        archive = self._archive(zip_path)
+        directory = directory.strip('/')
+        directory = directory + '/' if directory else ''
+        
+        with self.transaction() as cursor:
+            cursor.execute('''
+                SELECT * FROM zip_members WHERE archive_id = ? AND parent = ?
+                ORDER BY is_dir DESC, name
+            ''', (archive['id'], directory))
+            return [self._row(row) for row in cursor.fetchall()]
+    
+    def lookup(self, zip_path: Path, name: str):
+        """Запись члена архива по имени (None, если такого нет)"""
+        archive = self._archive(zip_path)
+        with self.transaction() as cursor:
+            cursor.execute("SELECT * FROM zip_members WHERE archive_id = ? AND name = ?", (archive['id'], name))
+            row = cursor.fetchone()
+            return self._row(row) if row else None
+    
+    def invalidate(self, zip_path: Path = None):
+        """Удаление индекса архива (всех архивов, если путь не указан)"""
+        with self.transaction() as cursor:
+            if zip_path is None:
+                cursor.execute("DELETE FROM zip_members")
+                cursor.execute("DELETE FROM zip_archives")
+            else:
+                cursor.execute('''
+                    DELETE FROM zip_members WHERE archive_id IN (SELECT id FROM zip_archives WHERE path = ?)
+                ''', (str(zip_path),))
+                cursor.execute("DELETE FROM zip_archives WHERE path = ?", (str(zip_path),))
+    
+    def _archive(self, zip_path: Path):
+        """Актуальная запись архива; перестраивает индекс, если (size, mtime_ns) изменились"""
+        zip_stat = zip_path.stat()
+        key = str(zip_path)
+        
+        row = self._load(key)
+        if self._is_fresh(row, zip_stat):
+            return row
+        
+        with self._lock:
+            # Другой поток мог уже перестроить индекс
+            row = self._load(key)
+            if self._is_fresh(row, zip_stat):
+                return row
+            
+            members = read_central_directory(zip_path)
+            real = [member for member in members if not member['synthetic']]
+            
+            with self.transaction() as cursor:
+                if row is not None:
+                    cursor.execute("DELETE FROM zip_members WHERE archive_id = ?", (row['id'],))
+                cursor.execute('''
+                    INSERT INTO zip_archives (path, size, mtime_ns, file_count, total_size, indexed_at)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                    ON CONFLICT(path) DO UPDATE SET size = excluded.size, mtime_ns = excluded.mtime_ns,
+                        file_count = excluded.file_count, total_size = excluded.total_size,
+                        indexed_at = excluded.indexed_at
+                ''', (key, zip_stat.st_size, zip_stat.st_mtime_ns, len(real),
+                      sum(member['file_size'] for member in real), time.time()))
+                cursor.execute("SELECT id FROM zip_archives WHERE path = ?", (key,))
+                archive_id = cursor.fetchone()['id']
+                cursor.executemany('''
+                    INSERT INTO zip_members (archive_id, name, parent, is_dir, file_size, compress_size, crc,
+                                             date_time, header_offset, synthetic)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ''', [(archive_id, member['name'], member['parent'], member['is_dir'], member['file_size'],
+                       member['compress_size'], member['crc'], member['date_time'], member['header_offset'],
+                       member['synthetic']) for member in members])
+            
+            return self._load(key)
+    
+    def _load(self, key: str):
+        with self.transaction() as cursor:
+            cursor.execute("SELECT * FROM zip_archives WHERE path = ?", (key,))
+            return cursor.fetchone()
+    
+    @staticmethod
+    def _is_fresh(row, zip_stat) -> bool:
+        return row is not None and row['size'] == zip_stat.st_size and row['mtime_ns'] == zip_stat.st_mtime_ns
+    
+    @staticmethod
+    def _row(row) -> dict:
+        member = dict(row)
+        del member['archive_id']
+        member['is_dir'] = bool(member['is_dir'])
+        member['synthetic'] = bool(member['synthetic'])
+        return member
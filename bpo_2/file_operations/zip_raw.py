@@ -0,0 +1,247 @@
+﻿import bz2
+import platform
+import struct
+import sys
+import zipfile
+import zlib
+
+DEFLATE_WINDOW = 32 * 1024  # Окно DEFLATE: столько предыдущих данных видит следующий фрагмент
+SPLITTABLE_METHODS = (zipfile.ZIP_STORED, zipfile.ZIP_DEFLATED)  # Методы, допускающие сжатие по фрагментам
+RAW_COPY_CHUNK_SIZE = 1024 * 1024
+MANIFEST_NAME = ".bpo_manifest.json"  # Служебный член архива инкрементального режима
+
+# RawMemberWriter и copy_member повторяют ZipFile._open_to_write на внутренностях
+# zipfile, проверенных на CPython 3.8-3.13. На других интерпретаторах и версиях
+# raw_write_supported возвращает False и вызывающий код пишет обычным zipf.write.
+_RAW_WRITE_VERSIONS = ((3, 8), (3, 13))
+_ZIPFILE_INTERNALS = ('_MASK_COMPRESS_OPTION_1', '_MASK_USE_DATA_DESCRIPTOR', '_DD_SIGNATURE',
+                      '_FH_SIGNATURE', '_FH_FILENAME_LENGTH', '_FH_EXTRA_FIELD_LENGTH',
+                      'sizeFileHeader', 'structFileHeader', 'stringFileHeader')
+_ZIPFILE_STATE = ('_writing', '_seekable', '_didModify', 'start_dir', 'fp', 'filelist', 'NameToInfo')
+_RAW_WRITE_RUNTIME = (
+    platform.python_implementation() == 'CPython'
+    and _RAW_WRITE_VERSIONS[0] <= sys.version_info[:2] <= _RAW_WRITE_VERSIONS[1]
+    and all(hasattr(zipfile, name) for name in _ZIPFILE_INTERNALS)
+    and callable(getattr(zipfile.ZipFile, '_writecheck', None))
+)
+
+
+def raw_write_supported(zipf: zipfile.ZipFile) -> bool:
+    """Можно ли писать в zipf готовые сжатые данные (RawMemberWriter, copy_member)"""
+    return _RAW_WRITE_RUNTIME and all(hasattr(zipf, name) for name in _ZIPFILE_STATE)
+
+
+def crc32_combine(crc1: int, crc2: int, len2: int) -> int:
+    """CRC-32 конкатенации A + B по crc(A), crc(B) и длине B (алгоритм zlib crc32_combine)"""
+    if len2 <= 0:
+        return crc1
+    
+    def times(matrix, vector):
+        result = 0
+        index = 0
+        while vector:
+            if vector & 1:
+                result ^= matrix[index]
+            vector >>= 1
+            index += 1
+        return result
+    
+    def square(matrix):
+        return [times(matrix, matrix[n]) for n in range(32)]
+    
+    # Оператор сдвига CRC на один нулевой бит, затем на 2 и 4 бита
+    odd = [0xEDB88320] + [1 << n for n in range(31)]
+    even = square(odd)
+    odd = square(even)
+    
+    # Применение len2 нулевых байтов к crc1 возведением оператора в квадрат
+    while True:
+        even = square(odd)
+        if len2 & 1:
+            crc1 = times(even, crc1)
+        len2 >>= 1
+        if not len2:
+            break
+        odd = square(even)
+        if len2 & 1:
+            crc1 = times(odd, crc1)
+        len2 >>= 1
+        if not len2:
+            break
+    
+    return crc1 ^ crc2
+
+
+def compress_segments(segments: list) -> list:
+    """Сжатие фрагментов файлов для члена ZIP (выполняется в процессе пула).
+    
+    segments - список (номер члена, путь, смещение, длина, последний ли фрагмент,
+    метод zipfile, уровень). Фрагменты одного файла с методом DEFLATE сжимаются
+    независимо: каждый, кроме последнего, завершается полным сбросом
+    (Z_FULL_FLUSH), поэтому их конкатенация дает корректный поток DEFLATE.
+    Словарь фрагмента - предыдущие 32 КБ файла, так что степень сжатия почти не
+    отличается от последовательной. STORED делится на фрагменты тривиально,
+    BZIP2 и LZMA всегда приходят одним фрагментом на файл. Возвращает список
+    (номер члена, crc32, прочитано байт, сжатые данные, последний ли фрагмент).
+    """
+    results = []
+    for member, path, offset, length, last, method, level in segments:
+        with open(path, 'rb') as f:
+            zdict = b''
+            if offset and method == zipfile.ZIP_DEFLATED:
+                start = max(0, offset - DEFLATE_WINDOW)
+                f.seek(start)
+                zdict = f.read(offset - start)
+            else:
+                f.seek(offset)
+            data = f.read(length)
+        
+        if method == zipfile.ZIP_STORED:
+            compressed = data
+        elif method == zipfile.ZIP_DEFLATED:
+            if level is None:
+                level = zlib.Z_DEFAULT_COMPRESSION
+            if zdict:
+                compressor = zlib.compressobj(level, zlib.DEFLATED, -15, zdict=zdict)
+            else:
+                compressor = zlib.compressobj(level, zlib.DEFLATED, -15)
+            compressed = compressor.compress(data)
+            compressed += compressor.flush(zlib.Z_FINISH if last else zlib.Z_FULL_FLUSH)
+        elif method == zipfile.ZIP_BZIP2:
+            compressed = bz2.compress(data, 9 if level is None else level)
+        elif method == zipfile.ZIP_LZMA:
+            compressor = zipfile.LZMACompressor()
+            compressed = compressor.compress(data) + compressor.flush()
+        else:
+            raise ValueError(f"Неподдерживаемый метод сжатия: {method}")
+        
+        results.append((member, zlib.crc32(data), len(data), compressed, last))
+    
+    return results
+
+
+class RawMemberWriter:
+    """Запись в открытый на запись ZipFile уже сжатых данных одного члена архива.
+    
+    Повторяет ZipFile._open_to_write/_ZipWriteFile.close, но принимает готовые
+    фрагменты DEFLATE вместо несжатых данных. Заголовок пишется заранее и
+    переписывается при закрытии (или дополняется дескриптором данных, если
+    приемник не поддерживает seek). Использовать, только если raw_write_supported(zipf).
+    """
+    
+    def __init__(self, zipf: zipfile.ZipFile, zinfo: zipfile.ZipInfo):
+        if not raw_write_supported(zipf):
+            raise NotImplementedError("Запись готовых сжатых данных не поддерживается этой версией zipfile")
+        
+        if zipf._writing:
+            raise ValueError("В архив уже пишется другой член")
+        
+        self.zipf = zipf
+        self.zinfo = zinfo
+        self.crc = 0
+        self.file_size = 0
+        self.compress_size = 0
+        
+        zinfo.compress_size = 0
+        zinfo.CRC = 0
+        zinfo.flag_bits = 0x00
+        if zinfo.compress_type == zipfile.ZIP_LZMA:
+            zinfo.flag_bits |= zipfile._MASK_COMPRESS_OPTION_1
+        if not zipf._seekable:
+            zinfo.flag_bits |= zipfile._MASK_USE_DATA_DESCRIPTOR
+        if not zinfo.external_attr:
+            zinfo.external_attr = 0o600 << 16
+        
+        # Сжатые данные могут оказаться больше исходных
+        self.zip64 = zinfo.file_size * 1.05 > zipfile.ZIP64_LIMIT
+        
+        if zipf._seekable:
+            zipf.fp.seek(zipf.start_dir)
+        zinfo.header_offset = zipf.fp.tell()
+        
+        zipf._writecheck(zinfo)
+        zipf._didModify = True
+        zipf.fp.write(zinfo.FileHeader(self.zip64))
+        zipf._writing = True
+    
+    def write(self, compressed: bytes, crc: int, length: int):
+        """Дозапись фрагмента: сжатые байты, CRC-32 и длина несжатых данных"""
+        self.zipf.fp.write(compressed)
+        self.crc = crc32_combine(self.crc, crc, length) if self.file_size else crc
+        self.file_size += length
+        self.compress_size += len(compressed)
+    
+    def write_stream(self, fp, compress_size: int, crc: int, file_size: int):
+        """Копирование готового сжатого потока целиком из fp (с текущей позиции)"""
+        remaining = compress_size
+        while remaining > 0:
+            chunk = fp.read(min(remaining, RAW_COPY_CHUNK_SIZE))
+            if not chunk:
+                raise zipfile.BadZipFile("Сжатые данные члена архива обрезаны")
+            self.zipf.fp.write(chunk)
+            remaining -= len(chunk)
+        
+        self.crc = crc
+        self.file_size = file_size
+        self.compress_size += compress_size
+    
+    def abort(self):
+        """Освобождение архива после ошибки: член в центральный каталог не попадает"""
+        self.zipf._writing = False
+    
+    def close(self):
+        """Завершение члена: запись CRC и размеров, добавление в центральный каталог"""
+        zipf = self.zipf
+        zinfo = self.zinfo
+        try:
+            zinfo.CRC = self.crc
+            zinfo.file_size = self.file_size
+            zinfo.compress_size = self.compress_size
+            
+            if not self.zip64 and max(self.file_size, self.compress_size) > zipfile.ZIP64_LIMIT:
+                raise zipfile.LargeZipFile("Размер члена архива требует ZIP64")
+            
+            if zinfo.flag_bits & zipfile._MASK_USE_DATA_DESCRIPTOR:
+                fmt = '<LLQQ' if self.zip64 else '<LLLL'
+                zipf.fp.write(struct.pack(fmt, zipfile._DD_SIGNATURE, zinfo.CRC,
+                                          zinfo.compress_size, zinfo.file_size))
+                zipf.start_dir = zipf.fp.tell()
+            else:
+                zipf.start_dir = zipf.fp.tell()
+                zipf.fp.seek(zinfo.header_offset)
+                zipf.fp.write(zinfo.FileHeader(self.zip64))
+                zipf.fp.seek(zipf.start_dir)
+            
+            zipf.filelist.append(zinfo)
+            zipf.NameToInfo[zinfo.filename] = zinfo
+        finally:
+            zipf._writing = False
+
+
+def copy_member(src_fp, src_info: zipfile.ZipInfo, zipf: zipfile.ZipFile):
+    """Перенос члена из другого архива в zipf без распаковки и повторного сжатия.
+    
+    src_fp - открытый на чтение файл исходного архива, src_info - запись его
+    центрального каталога. Данные копируются побайтно; CRC и размеры берутся из
+    исходной записи.
+    """
+    src_fp.seek(src_info.header_offset)
+    header = src_fp.read(zipfile.sizeFileHeader)
+    if len(header) != zipfile.sizeFileHeader:
+        raise zipfile.BadZipFile("Обрезанный локальный заголовок")
+    
+    fields = struct.unpack(zipfile.structFileHeader, header)
+    if fields[zipfile._FH_SIGNATURE] != zipfile.stringFileHeader:
+        raise zipfile.BadZipFile("Неверная сигнатура локального заголовка")
+    
+    # Пропуск имени и дополнительных полей: дальше идут сжатые данные
+    src_fp.seek(fields[zipfile._FH_FILENAME_LENGTH] + fields[zipfile._FH_EXTRA_FIELD_LENGTH], 1)
+    
+    zinfo = zipfile.ZipInfo(src_info.filename, src_info.date_time)
+    zinfo.compress_type = src_info.compress_type
+    zinfo.external_attr = src_info.external_attr
+    zinfo.file_size = src_info.file_size
+    
+    writer = RawMemberWriter(zipf, zinfo)
+    writer.write_stream(src_fp, src_info.compress_size, src_info.CRC, src_info.file_size)
+    writer.close()